@@ -1,11 +1,25 @@
 # Import libraries
 import streamlit as st
 import pandas as pd
+import numpy as np
 import altair as alt
 from datetime import datetime
 from altair import datum
 from google.oauth2 import service_account
 from google.cloud import bigquery
+from amtiss.detailed_view import detailed_view
+from amtiss.formatting import format_price, format_number, price_expr, number_expr
+from amtiss.approximate import APPROX_ROW_THRESHOLD, stratified_sample, estimate_totals
+from amtiss.aggregates import PERIOD_COLUMNS, period_aggregate
+from amtiss.heatmap import METRICS, ROW_ORDERS, heatmap_matrix
+from amtiss.distribution import SORT_ORDERS, distribution_rankings
+from amtiss.anomaly import ROLLING_PERIODS, Z_THRESHOLD, fleet_anomalies
+from amtiss.leaderboard import LEVELS, MIN_WORK_HOURS, WINDOWS, fleet_leaderboards, top_n
+from amtiss.lifecycle import MAX_POINTS, lifecycle_curves
+from amtiss.pareto import PARETO_SHARE, pareto, product_spend
+from amtiss.resets import RESET_KEYS, corrected_hours, corrected_series, reset_events
+from amtiss.hm_quality import CHECKS, MAX_DAILY_HOURS, MAX_GAP_DAYS, hour_meter_quality
+from amtiss.forecast import FREQUENCIES, TOP_ASSETS, ForecastStore
 
 if 'sbstate' not in st.session_state:
     st.session_state.sbstate = 'collapsed'
@@ -44,13 +58,37 @@ def run_query(query):
     rows = [dict(row) for row in rows_raw]
     return rows
 
+# --The query rows as a dataframe with a version of their content, hashed once per query load; the
+# --loaders below are cached on the version and take the frame unhashed (leading underscore) instead of
+# --hashing the whole frame on every rerun
+@st.cache_data(ttl=600)
+def load_union_hm_gc(query):
+    df = pd.DataFrame(run_query(query))
+    df['date'] = pd.to_datetime(df['date'])
+    return df, str(int(pd.util.hash_pandas_object(df, index=False).sum()))
+
 # Query
 # 1.Query for Cost and Hour Meter Trend
-db_search=run_query(
+db_search, db_search_version = load_union_hm_gc(
     "SELECT * FROM amtiss-dashboard-performance.amtiss_lma.union_hm_gc ORDER BY date"
 )
-db_search = pd.DataFrame(db_search)
-db_search['date'] = pd.to_datetime(db_search['date'])
+
+@st.cache_data(ttl=600)
+def load_hm_quality(version, _df):
+    return hour_meter_quality(_df)
+
+# --Hour meter rows failing the data quality checks can be left out of every chart and metric below,
+# --the scan itself always runs over every row
+db_search_all = db_search
+data_version = db_search_version
+if st.session_state.get('exclude_suspect_hm', False):
+    hm_quality_rows = load_hm_quality(db_search_version, db_search_all)[0]
+    db_search = db_search[~db_search.index.isin(hm_quality_rows.index[hm_quality_rows['suspect'].to_numpy()])]
+    data_version = db_search_version + '-suspect-excluded'
+
+# --Hours worked of every hour meter row, a reset row carries the drop of the meter instead and adds nothing;
+# --the hour meter charts sum this column so a reset does not net into the period totals
+db_search = db_search.assign(corrected_hours=np.where(db_search['source'] == 'hm_record', corrected_hours(db_search), np.nan))
 
 # 2. Query for value metrics hour meter
 query_df_value_metrics_hour_meter = db_search[db_search['source'] == 'hm_record']
@@ -58,35 +96,105 @@ query_df_value_metrics_hour_meter = db_search[db_search['source'] == 'hm_record'
 # 3. Query for values metrics good consume
 query_df_value_metrics_good_consume = db_search[db_search['source'] == 'good_consume']
 
-# Helper Function
-# --Function to format prices in Indonesian style
-def format_price(price):
-    if price >= 1000000000000:
-        formatted_price = f"Rp {price / 1000000000000:.2f} T"
-    elif price >= 1000000000:
-        formatted_price = f"Rp {price / 1000000000:.2f} M"
-    elif price >= 1000000:
-        formatted_price = f"Rp {price / 1000_000:.2f} jt"
-    elif price >= 1000:
-        formatted_price = f"Rp {price / 1000:.2f} rb"
-    else:
-        formatted_price = f"Rp {price:.2f}"
-    formatted_price = formatted_price.replace('.', ',')
-    return formatted_price
-
-def format_number(price):
-    if price >= 1000000000000:
-        formatted_price = f"{price / 1000000000000:.2f} T"
-    elif price >= 1000000000:
-        formatted_price = f"{price / 1000000000:.2f} M"
-    elif price >= 1000000:
-        formatted_price = f"{price / 1000_000:.2f} jt"
-    elif price >= 1000:
-        formatted_price = f"{price / 1000:.2f} rb"
-    else: 
-        formatted_price = f"{price:.0f}"
-    formatted_price = formatted_price.replace('.', ',')
-    return formatted_price
+# 4. Raw row counts per category, used to decide when a selection gets an approximate preview first
+category_row_counts = db_search['asset_category'].value_counts()
+
+@st.cache_data(ttl=600)
+def load_period_aggregate(version, _df, period_column):
+    return period_aggregate(_df, period_column)
+
+@st.cache_data(ttl=600)
+def load_fleet_anomalies(version, _df):
+    return fleet_anomalies(_df)
+
+@st.cache_data(ttl=600)
+def load_fleet_leaderboards(version, _df):
+    return fleet_leaderboards(_df)
+
+@st.cache_data(ttl=600)
+def load_lifecycle_curves(version, _df):
+    return lifecycle_curves(_df)
+
+@st.cache_data(ttl=600)
+def load_product_spend(version, _df):
+    return product_spend(_df)
+
+@st.cache_data(ttl=600)
+def load_reset_events(version, _df):
+    events = reset_events(corrected_series(_df))
+    # --Period labels of the reset day, so the resets can be marked on the chart of every period
+    periods = _df[_df['source'] == 'hm_record'].drop_duplicates(RESET_KEYS + ['date'])
+    periods = periods[RESET_KEYS + ['date'] + list(PERIOD_COLUMNS.values())[1:]]
+    events = events.merge(periods, on=RESET_KEYS + ['date'], how='left')
+    events['date_only'] = events['date'].dt.date.astype('str')
+    events['annotation'] = events['asset_code'] + ' hour meter is reset'
+    return events
+
+# --Rules marking the hour meter resets of the selected assets or categories in the charted periods
+def reset_annotation(key, selected, option_date, grouped_df):
+    period_column = PERIOD_COLUMNS[option_date]
+    df_annotation = load_reset_events(data_version, db_search)
+    df_annotation = df_annotation[df_annotation[key].isin(selected) & df_annotation[period_column].isin(grouped_df[period_column])]
+    return alt.Chart(df_annotation).mark_rule().encode(
+        x=f'{period_column}:O',
+        size=alt.value(2),
+        tooltip = [
+                alt.Tooltip('annotation', title='Event'),
+                alt.Tooltip('date_only', title='Date'),
+                alt.Tooltip('pre_reset_reading', title='Hour Meter Before Reset', format=',.1f')
+            ],
+        color = alt.value('black')
+    )
+
+# Cost forecasts, fitted offline by `python -m amtiss.forecast`; reloaded every 10 minutes so a refit
+# is picked up without a restart
+@st.cache_resource(ttl=600)
+def load_forecast_store():
+    return ForecastStore()
+
+@st.cache_data(ttl=600)
+def load_forecasts(version, level, keys, frequency):
+    return load_forecast_store().lookup(level, keys, frequency)
+
+# --Cost trend chart with the forecast band and dashed forecast line of the next periods layered on,
+# --the chart alone when the forecasts cannot be labelled like its periods
+def with_forecast(chart, level, keys, frequency):
+    period_column = FREQUENCIES[frequency][1]
+    df_forecast = load_forecasts(forecast_version, level, tuple(keys), frequency)
+    if df_forecast is None:
+        return chart
+    x = alt.X(f'{period_column}:O', title=None, sort=alt.SortField(field=period_column, order='ascending'))
+    forecast_band = alt.Chart(df_forecast).mark_area(opacity=0.2).encode(
+        x=x,
+        y=alt.Y('lower:Q'),
+        y2='upper:Q',
+        color=alt.Color(level)
+    )
+    forecast_line = alt.Chart(df_forecast).mark_line(strokeDash=[4, 4]).encode(
+        x=x,
+        y=alt.Y('forecast:Q'),
+        color=alt.Color(level),
+        tooltip=[
+            alt.Tooltip(period_column, title='Period'),
+            alt.Tooltip(level, title='Asset Code' if level == 'asset_code' else 'Asset Category'),
+            alt.Tooltip('forecast:Q', title='Forecast Cost (all products)', format=',.0f'),
+            alt.Tooltip('lower:Q', title='Forecast Low', format=',.0f'),
+            alt.Tooltip('upper:Q', title='Forecast High', format=',.0f')
+        ]
+    )
+    return chart + forecast_band + forecast_line
+
+@st.cache_data(ttl=600)
+def load_distribution_rankings(version, _df):
+    return distribution_rankings(_df)
+
+@st.cache_data(ttl=600)
+def load_stratified_sample(version, _df):
+    sample = stratified_sample(_df, ['source', 'asset_category'])
+    sample['date_only'] = sample['date'].dt.date.astype(str)
+    return sample
+
+forecast_version = load_forecast_store().version
 
 st.image('amtiss_logo-bg-white-1.png', width=150)
 
@@ -192,26 +300,23 @@ with cols[4]:
 # Page Break
 st.divider()
 
+# --Going back to the first page when the ranking changes
+def reset_button_chart():
+    st.session_state.start_index_chart = 0
+    st.session_state.next_index_chart = 10
+
 # --Making an expander to show data distribution
 with st.container(border=True):
     st.markdown("<h3 style='text-align: center; color: black;'>Data Distribution for Each Categories</h3>", unsafe_allow_html=True)
+    # --Statistics and rankings are computed once per data refresh, a page below is only a slice
+    distribution_sort = st.selectbox(
+        'Sort categories by',
+        list(SORT_ORDERS),
+        index=0,
+        on_change=reset_button_chart
+    )
+    distribution_rankings_all = load_distribution_rankings(data_version, db_search)
     cols_exp = st.columns(2)
-    # Ensure the columns are numeric
-    # db_search['total_price'] = pd.to_numeric(db_search['total_price'], errors='coerce')
-    # db_search['hour_meter_per_date'] = pd.to_numeric(db_search['hour_meter_per_date'], errors='coerce')
-
-    # Handle missing values
-    # db_search['total_price'].fillna(0, inplace=True)
-    # db_search['hour_meter_per_date'].fillna(0, inplace=True)
-
-    df_for_chart_exp = db_search.groupby(['source', 'asset_category']).agg(
-        mean_total_price=('total_price', 'mean'),
-        mean_hour_meter_per_date=('hour_meter_per_date', 'mean'),
-        distinct_asset_codes=('asset_code', pd.Series.nunique)
-    ).sort_values(by=['mean_total_price', 'mean_hour_meter_per_date'], ascending=[False, False]).reset_index()
-
-    df_for_chart_exp['mean_total_price'] = round(df_for_chart_exp['mean_total_price'])
-    df_for_chart_exp['mean_hour_meter_per_date'] = round(df_for_chart_exp['mean_hour_meter_per_date'])
     
     if 'start_index_chart' not in st.session_state:
         st.session_state.start_index_chart = 0
@@ -233,58 +338,64 @@ with st.container(border=True):
     if st.session_state.start_index_chart == 0 :
         disable_start_session_button_chart = True    
 
-    if st.session_state.next_index_chart >= len(df_for_chart_exp[df_for_chart_exp['source'] == 'good_consume']) :
+    if st.session_state.next_index_chart >= max(len(ranking[distribution_sort]) for ranking in distribution_rankings_all.values()) :
         disable_next_session_button_chart = True
 
+    # --Box plot built from the precomputed statistics, whiskers at 1.5 IQR
+    def box_plot_chart(df_stats, value_expr, value_title, color):
+        df_stats = df_stats.assign(rank=range(len(df_stats.index)))
+        base = alt.Chart(df_stats).transform_calculate(
+            mean_format=value_expr('datum.mean'),
+            median_format=value_expr('datum.median'),
+            p90_format=value_expr('datum.p90'),
+            iqr_format=value_expr('datum.iqr')
+        ).encode(
+            y=alt.Y('asset_category:N', sort=alt.SortField(field='rank', order='ascending'), title=None),
+            tooltip=[
+                alt.Tooltip('asset_category', title='Category Name'),
+                alt.Tooltip('count', title='Number of Records'),
+                alt.Tooltip('distinct_asset_codes', title='Number of Assets'),
+                alt.Tooltip('mean_format:N', title=f'Average {value_title}'),
+                alt.Tooltip('median_format:N', title=f'Median {value_title}'),
+                alt.Tooltip('p90_format:N', title=f'P90 {value_title}'),
+                alt.Tooltip('iqr_format:N', title='Interquartile Range')
+            ]
+        )
+        whisker = base.mark_rule(color='gray').encode(
+            x=alt.X('whisker_low:Q', title=value_title, axis=alt.Axis(labelExpr=value_expr())),
+            x2='whisker_high:Q'
+        )
+        box = base.mark_bar(size=14, color=color).encode(
+            x='q1:Q',
+            x2='q3:Q'
+        )
+        median = base.mark_tick(color='black', thickness=2, size=14).encode(
+            x='median:Q'
+        )
+        mean = base.mark_point(color='white', filled=True, size=20).encode(
+            x='mean:Q'
+        )
+        return whisker + box + median + mean
+
     with cols_exp[0]:
         with st.container(border=True, height=450):
-            st.subheader('**AVG Maintenance Price per Category**')
+            st.subheader('**Maintenance Price Distribution per Category**')
             st.write('')
             st.write('')
             
-            # Bar Chart distribusi vertikal untuk good_consume
-            df_good_consume = df_for_chart_exp[df_for_chart_exp['source'] == 'good_consume'][st.session_state.start_index_chart:st.session_state.next_index_chart]
-            df_good_consume['indonesia_price_format'] = df_good_consume['mean_total_price'].apply(format_price)
-            
-            bar_chart_good_consume = alt.Chart(df_good_consume).mark_bar().encode(
-                x=alt.X('mean_total_price:Q', title='Total Price'),
-                y=alt.Y('asset_category:N', sort=alt.SortField(field='mean_total_price', order='descending'), title=None),
-                text=alt.Text('indonesia_price_format:N'),
-                color=alt.value('green'),
-                tooltip = [
-                    alt.Tooltip('asset_category', title='Category Name'),
-                    alt.Tooltip('indonesia_price_format', title='Average Total Maintenance Price'),
-                    alt.Tooltip('distinct_asset_codes', title='Number of Assets')
-                ]
-            )
-            label_bar_exp_good_consume = bar_chart_good_consume.mark_text(align='left', dx=3)
-            combo_chart_exp_good_consume = bar_chart_good_consume + label_bar_exp_good_consume
-            st.altair_chart(combo_chart_exp_good_consume, use_container_width=True)
+            # Box plot distribusi untuk good_consume
+            df_good_consume = distribution_rankings_all['good_consume'][distribution_sort].iloc[st.session_state.start_index_chart:st.session_state.next_index_chart]
+            st.altair_chart(box_plot_chart(df_good_consume, price_expr, 'Total Price', 'green'), use_container_width=True)
 
     with cols_exp[1]:
         with st.container(border=True, height=450):
-            st.subheader('**AVG Hour Used per Category**')
+            st.subheader('**Hour Used Distribution per Category**')
             st.write('')
             st.write('')
             
-            # Bar Chart distribusi vertikal untuk hour_meter
-            df_hour_meter = df_for_chart_exp[df_for_chart_exp['source'] == 'hm_record'][st.session_state.start_index_chart:st.session_state.next_index_chart]
-            df_hour_meter['number_format'] = df_hour_meter['mean_hour_meter_per_date'].apply(format_number)
-
-            bar_chart_hour_meter = alt.Chart(df_hour_meter).mark_bar().encode(
-                x=alt.X('mean_hour_meter_per_date:Q', title='Work Hour'),
-                y=alt.Y('asset_category:N', sort=alt.SortField(field='mean_hour_meter_per_date', order='descending'), title=None),
-                text=alt.Text('number_format:N'),
-                color=alt.value('#d1c304'),
-                tooltip = [
-                    alt.Tooltip('asset_category', title='Category Name'),
-                    alt.Tooltip('number_format', title='Average Work Hour'),
-                    alt.Tooltip('distinct_asset_codes', title='Number of Assets')
-                ]
-            )
-            label_bar_exp_hour_meter = bar_chart_hour_meter.mark_text(align='left', dx=3)
-            combo_chart_exp_hour_meter = bar_chart_hour_meter + label_bar_exp_hour_meter
-            st.altair_chart(combo_chart_exp_hour_meter, use_container_width=True)
+            # Box plot distribusi untuk hour_meter
+            df_hour_meter = distribution_rankings_all['hm_record'][distribution_sort].iloc[st.session_state.start_index_chart:st.session_state.next_index_chart]
+            st.altair_chart(box_plot_chart(df_hour_meter, number_expr, 'Work Hour', '#d1c304'), use_container_width=True)
         
     # --Making the buttons for paginating the bar charts
     cols_button = st.columns([0.11, 0.89])
@@ -298,6 +409,251 @@ with st.container(border=True):
  
 st.write('')
 st.write('')
+
+# --Fleet panels: Streamlit runs the body of a collapsed expander on every rerun, so each panel is only
+# --computed while its toggle is on
+
+# --Fleet wide heatmap, every asset or category against every period in one chart
+with st.expander("**Fleet Overview**"):
+    if st.toggle('Show', key='show_fleet_overview'):
+        cols_heatmap = st.columns(4)
+        with cols_heatmap[0]:
+            heatmap_metric = st.selectbox('Metric', list(METRICS), index=0)
+        with cols_heatmap[1]:
+            heatmap_rows = st.selectbox('Rows', ['Assets', 'Categories'], index=0)
+        with cols_heatmap[2]:
+            heatmap_period = st.selectbox('Period', ['Weekly', 'Monthly', 'Quarter', 'Semester', 'Yearly'], index=1)
+        with cols_heatmap[3]:
+            heatmap_order = st.selectbox('Order rows by', ROW_ORDERS, index=0, help="Similarity puts assets with the same pattern over time next to each other")
+    
+        # --The matrix is binned server side so thousands of assets still fit in one chart
+        heatmap_height = 600
+        df_heatmap = heatmap_matrix(
+            load_period_aggregate(data_version, db_search, PERIOD_COLUMNS[heatmap_period]),
+            'asset_code' if heatmap_rows == 'Assets' else 'asset_category',
+            METRICS[heatmap_metric],
+            order=heatmap_order,
+            max_rows=heatmap_height // 3,
+            row_noun='assets' if heatmap_rows == 'Assets' else 'categories'
+        )
+    
+        value_format = price_expr() if heatmap_metric != 'Hours Worked' else number_expr()
+        heatmap_chart = alt.Chart(df_heatmap).mark_rect().encode(
+            x=alt.X('period:O', title=None, sort=alt.SortField(field='period_rank', order='ascending')),
+            y=alt.Y('row:N', title=None, sort=alt.SortField(field='row_rank', order='ascending'), axis=alt.Axis(labels=bool(len(df_heatmap.index) == 0 or df_heatmap['row_rank'].max() < 60))),
+            color=alt.Color('value:Q', title=heatmap_metric, scale=alt.Scale(scheme='orangered'), legend=alt.Legend(labelExpr=value_format)),
+            tooltip=[
+                alt.Tooltip('row:N', title=heatmap_rows),
+                alt.Tooltip('period:O', title='Period'),
+                alt.Tooltip('value:Q', title=heatmap_metric, format=',.2f')
+            ]
+        ).properties(
+            height=heatmap_height
+        )
+        st.altair_chart(heatmap_chart, use_container_width=True)
+
+st.write('')
+st.write('')
+
+# --Cost per hour anomalies of the current selection, scored for the whole fleet at once
+with st.expander("**Cost Anomalies**"):
+    if st.toggle('Show', key='show_cost_anomalies'):
+        st.caption(f"Periods where the cost per hour worked is more than {Z_THRESHOLD} robust deviations above the asset's previous {ROLLING_PERIODS} periods or above the other assets of its category in the same period, for the '{option_date}' filter.")
+
+        df_anomalies = load_fleet_anomalies(data_version, db_search)[option_date]
+        if disable_filter_asset == False:
+            df_anomalies = df_anomalies[df_anomalies['asset_code'].isin(option_asset)]
+        else:
+            # --Only the assets with the strongest anomalies get a line, a category can hold hundreds of assets
+            df_anomalies = df_anomalies[df_anomalies['asset_category'].isin(option_category)]
+            top_assets = df_anomalies.groupby('asset_code')['score'].max().nlargest(10).index
+            df_anomalies = df_anomalies[df_anomalies['asset_code'].isin(top_assets)]
+
+        anomaly_base = alt.Chart(df_anomalies).encode(
+            x=alt.X('period:O', title=None, sort=alt.SortField(field='period', order='ascending'))
+        )
+        anomaly_line = anomaly_base.mark_line(opacity=0.6).encode(
+            y=alt.Y('cost_per_hour:Q', title='Cost per Hour', axis=alt.Axis(labelExpr=price_expr())),
+            color=alt.Color('asset_code:N', title='Asset Code')
+        )
+        anomaly_points = anomaly_base.mark_circle(size=90, color='red').encode(
+            y=alt.Y('cost_per_hour:Q'),
+            tooltip=[
+                alt.Tooltip('period:O', title='Period'),
+                alt.Tooltip('asset_code:N', title='Asset Code'),
+                alt.Tooltip('cost_per_hour:Q', title='Cost per Hour', format=',.0f'),
+                alt.Tooltip('rolling_median:Q', title='Usual Cost per Hour', format=',.0f'),
+                alt.Tooltip('peer_median:Q', title='Category Cost per Hour', format=',.0f'),
+                alt.Tooltip('score:Q', title='Score', format='.1f')
+            ]
+        ).transform_filter(
+            datum.flagged
+        )
+        st.altair_chart((anomaly_line + anomaly_points).properties(height=350), use_container_width=True)
+
+        st.write('**Ranked anomalies**')
+        ranked_anomalies = df_anomalies[df_anomalies['flagged']].sort_values('score', ascending=False)[[
+            'asset_category', 'asset_code', 'period', 'maintenance_cost', 'work_hours', 'cost_per_hour',
+            'rolling_median', 'peer_median', 'robust_z', 'peer_z', 'score'
+        ]]
+        detailed_view(ranked_anomalies, key='anomaly_view', page_size=20, formatters={
+            'maintenance_cost': format_price, 'cost_per_hour': format_price,
+            'rolling_median': format_price, 'peer_median': format_price, 'work_hours': format_number
+        })
+
+st.write('')
+st.write('')
+
+# --Fleet wide ranking by cost per hour worked, every standard window is computed once per data load
+with st.expander("**Fleet Leaderboard**"):
+    if st.toggle('Show', key='show_fleet_leaderboard'):
+        cols_leaderboard = st.columns(3)
+        with cols_leaderboard[0]:
+            leaderboard_window = st.selectbox('Window', list(WINDOWS), index=1)
+        with cols_leaderboard[1]:
+            leaderboard_level = st.selectbox('Rank', list(LEVELS), index=0)
+        with cols_leaderboard[2]:
+            leaderboard_size = st.number_input('Show', min_value=5, max_value=50, value=10, step=5)
+
+        board = load_fleet_leaderboards(data_version, db_search)[(leaderboard_window, leaderboard_level)]
+        board_key = 'asset_code' if leaderboard_level == 'Assets' else 'asset_category'
+        st.caption(f"Cost per hour worked over the {leaderboard_window.lower()} of records, {len(board)} {leaderboard_level.lower()} with at least {MIN_WORK_HOURS} hours worked.")
+
+        cols_board = st.columns(2)
+        for col_board, highest, title, color in [(cols_board[0], True, 'Highest Cost per Hour', 'red'), (cols_board[1], False, 'Lowest Cost per Hour', 'green')]:
+            with col_board:
+                ranked = top_n(board, leaderboard_size, highest=highest)
+                ranked_chart = alt.Chart(ranked).mark_bar(color=color).encode(
+                    x=alt.X('cost_per_hour:Q', title='Cost per Hour', axis=alt.Axis(labelExpr=price_expr())),
+                    y=alt.Y(f'{board_key}:N', title=None, sort=None),
+                    tooltip=[
+                        alt.Tooltip(f'{board_key}:N', title='Asset Code' if board_key == 'asset_code' else 'Asset Category'),
+                        alt.Tooltip('cost_per_hour:Q', title='Cost per Hour', format=',.0f'),
+                        alt.Tooltip('maintenance_cost:Q', title='Total Cost', format=',.0f'),
+                        alt.Tooltip('work_hours:Q', title='Total Hours', format=',.1f')
+                    ]
+                ).properties(
+                    title=title
+                )
+                st.altair_chart(ranked_chart, use_container_width=True)
+
+st.write('')
+st.write('')
+
+# --Cumulative cost against cumulative hours worked over the life of the assets, a steepening curve
+# --means every hour worked is getting more expensive
+with st.expander("**Lifecycle Cost**"):
+    if st.toggle('Show', key='show_lifecycle_cost'):
+        st.caption(f"Cumulative maintenance cost against cumulative hours worked, hour meter resets are left out of the hours. Every curve is reduced to at most {MAX_POINTS} points.")
+
+        df_lifecycle = load_lifecycle_curves(data_version, db_search)
+        if disable_filter_asset == False:
+            df_lifecycle = df_lifecycle[df_lifecycle['asset_code'].isin(option_asset)]
+        else:
+            # --Only the most expensive assets get a curve, a category can hold hundreds of assets
+            df_lifecycle = df_lifecycle[df_lifecycle['asset_category'].isin(option_category)]
+            top_assets = df_lifecycle.groupby('asset_code')['cumulative_cost'].max().nlargest(10).index
+            df_lifecycle = df_lifecycle[df_lifecycle['asset_code'].isin(top_assets)]
+
+        lifecycle_chart = alt.Chart(df_lifecycle).mark_line().encode(
+            x=alt.X('cumulative_hours:Q', title='Cumulative Hours Worked', axis=alt.Axis(labelExpr=number_expr())),
+            y=alt.Y('cumulative_cost:Q', title='Cumulative Cost', axis=alt.Axis(labelExpr=price_expr())),
+            color=alt.Color('asset_code:N', title='Asset Code'),
+            order=alt.Order('day:T'),
+            tooltip=[
+                alt.Tooltip('asset_code:N', title='Asset Code'),
+                alt.Tooltip('day:T', title='Date'),
+                alt.Tooltip('cumulative_hours:Q', title='Hours Worked', format=',.1f'),
+                alt.Tooltip('cumulative_cost:Q', title='Total Cost', format=',.0f')
+            ]
+        ).properties(
+            height=350
+        )
+        st.altair_chart(lifecycle_chart, use_container_width=True)
+
+st.write('')
+st.write('')
+
+# --Products making up most of the spend of the selection, read from the per product spend table
+with st.expander("**Product Spend Pareto**"):
+    if st.toggle('Show', key='show_product_spend_pareto'):
+        if disable_filter_asset == False:
+            df_pareto = pareto(load_product_spend(data_version, db_search), 'Assets', option_asset)
+        else:
+            df_pareto = pareto(load_product_spend(data_version, db_search), 'Categories', option_category)
+        vital_count = int(df_pareto['vital'].sum())
+        st.caption(f"{vital_count} of {len(df_pareto)} products make up {PARETO_SHARE:.0%} of the maintenance cost of the selection.")
+
+        pareto_size = st.number_input('Show products', min_value=5, max_value=100, value=max(5, min(vital_count, 30)), step=5)
+        df_pareto_top = df_pareto.head(pareto_size)
+        pareto_base = alt.Chart(df_pareto_top).encode(
+            x=alt.X('product_name:N', title=None, sort=None, axis=alt.Axis(labelAngle=-45))
+        )
+        pareto_bars = pareto_base.mark_bar().encode(
+            y=alt.Y('total_price:Q', title='Total Price', axis=alt.Axis(labelExpr=price_expr())),
+            color=alt.condition(datum.vital, alt.value('green'), alt.value('lightgray')),
+            tooltip=[
+                alt.Tooltip('product_name:N', title='Product'),
+                alt.Tooltip('total_price:Q', title='Total Price', format=',.0f'),
+                alt.Tooltip('purchases:Q', title='Purchases'),
+                alt.Tooltip('share:Q', title='Share', format='.1%'),
+                alt.Tooltip('cumulative_share:Q', title='Cumulative Share', format='.1%')
+            ]
+        )
+        pareto_line = pareto_base.mark_line(color='red', point=True).encode(
+            y=alt.Y('cumulative_share:Q', title='Cumulative Share', axis=alt.Axis(format='%'), scale=alt.Scale(domain=[0, 1]))
+        )
+        pareto_rule = alt.Chart(pd.DataFrame({'share': [PARETO_SHARE]})).mark_rule(color='red', strokeDash=[4, 4]).encode(
+            y=alt.Y('share:Q', scale=alt.Scale(domain=[0, 1]))
+        )
+        st.altair_chart(alt.layer(pareto_bars, pareto_line + pareto_rule).resolve_scale(y='independent').properties(height=350), use_container_width=True)
+
+        st.write('**Products by spend**')
+        detailed_view(df_pareto, key='pareto_view', page_size=20, formatters={'total_price': format_price})
+
+st.write('')
+st.write('')
+
+# --Summary of the hour meter data quality scan, run once per data load over every hm_record row
+with st.expander("**Hour Meter Data Quality**"):
+    st.checkbox(
+        'Exclude suspect hour meter readings',
+        key='exclude_suspect_hm',
+        help='Leaves duplicate, negative, too large and missing readings out of every chart and metric of this page. Gaps only flag the asset.'
+    )
+
+    if st.toggle('Show', key='show_hm_quality'):
+        st.caption(f"Readings are checked for duplicates on the same day, negative hours without a reset, more than {MAX_DAILY_HOURS} hours a day, missing hours and gaps longer than {MAX_GAP_DAYS} days.")
+
+        hm_quality_assets = load_hm_quality(db_search_version, db_search_all)[1]
+        quality_assets = hm_quality_assets[hm_quality_assets['asset_category'].isin(option_category)]
+        cols_quality = st.columns(len(CHECKS) + 1)
+        with cols_quality[0]:
+            st.metric('**Flagged Assets**', value=int(quality_assets['flagged'].sum()), help=f'Out of {len(quality_assets)} assets with hour meter readings in the current categories')
+        for col_quality, (check, description) in zip(cols_quality[1:], CHECKS.items()):
+            with col_quality:
+                st.metric(f"**{check.replace('_', ' ').capitalize()}**", value=int(quality_assets[check].sum()), help=description)
+
+        quality_counts = quality_assets.groupby('asset_category')[list(CHECKS)].sum().reset_index().melt(
+            id_vars='asset_category', var_name='check', value_name='count'
+        )
+        quality_chart = alt.Chart(quality_counts[quality_counts['count'] > 0]).mark_bar().encode(
+            x=alt.X('count:Q', title='Flagged Readings'),
+            y=alt.Y('asset_category:N', title=None, sort='-x'),
+            color=alt.Color('check:N', title='Check'),
+            tooltip=[
+                alt.Tooltip('asset_category:N', title='Asset Category'),
+                alt.Tooltip('check:N', title='Check'),
+                alt.Tooltip('count:Q', title='Flagged Readings')
+            ]
+        )
+        st.altair_chart(quality_chart, use_container_width=True)
+
+        st.write('**Flagged assets**')
+        detailed_view(quality_assets[quality_assets['flagged']], key='hm_quality_view', page_size=20, formatters={'suspect_share': lambda share: share.map('{:.1%}'.format)})
+
+st.write('')
+st.write('')
     
 # --Grouped by Asset
 if disable_filter_asset == False:
@@ -336,22 +692,12 @@ if disable_filter_asset == False:
         db_search_filtered['date_only'] = db_search_filtered['date'].dt.date
         
         # --make a new dataframe for the chart for convenience
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'date_only', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'date_only', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'max'
-        })
+            'corrected_hours':'max'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df['date_only'] = grouped_df['date_only'].astype('str')
 
-        # --Making annotation for the line chart if User reset the hour meter value
-        # --Filter rows where reset_hm is 'true'
-        # reset_rows = grouped_df[grouped_df['reset_hm'] == 'true']
-
-        # --Create a list of tuples containing annotation_date_and_text
-        # annotation_list = [(row['date'], f'{row['asset_code']} hour meter is reset') for index, row in reset_rows.iterrows()]
-        
-        # --Create the dataframe of the annotation
-        # df_annotation = pd.DataFrame(annotation_list, columns=['date', 'annotation'])
-        
         # Chart Making
         hover = alt.selection_point(
             fields=["date_only"],
@@ -367,7 +713,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset Maintenance Cost Trend',
@@ -433,29 +779,21 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
 
-        # --The chart of the annotation
-        # chart_annotation = alt.Chart(df_annotation).mark_rule().encode(
-        #     x="date:O",
-        #     size=alt.value(2),
-        #     tooltip = [
-        #             alt.Tooltip('annotation', title='Event'),
-        #             alt.Tooltip('date', title='Date')
-        #         ],
-        #     color = alt.value('black')
-        # )
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
         
-        # combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
         
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_daily_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Weekly':
         db_search_filtered = db_search[db_search['asset_code'].isin(option_asset)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_code', 'date'], ascending=[True, True])
@@ -470,10 +808,10 @@ if disable_filter_asset == False:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'week_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'week_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_code', 'week_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -491,7 +829,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -557,16 +895,21 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_weekly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Monthly':
         db_search_filtered = db_search[db_search['asset_code'].isin(option_asset)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_code', 'date'], ascending=[True, True])
@@ -581,10 +924,10 @@ if disable_filter_asset == False:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'month_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'month_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_code', 'month_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -602,7 +945,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -629,7 +972,7 @@ if disable_filter_asset == False:
             .add_params(hover)
         )
         
-        combo_line_chart_1 = line_chart_1 + points + tooltips
+        combo_line_chart_1 = with_forecast(line_chart_1 + points + tooltips, 'asset_code', option_asset, 'Monthly')
         
         # Brushing selection to help better view of the bar chart
         brush = alt.selection_interval(encodings=['x'], name='brush', empty=False)
@@ -668,16 +1011,22 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
+        st.caption(f'The dashed line and band are the forecast cost of all products with its 10th to 90th percentile range, for the {TOP_ASSETS} assets with the highest spend over the last 12 months.')
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_monthly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Quarter':
         db_search_filtered = db_search[db_search['asset_code'].isin(option_asset)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_code', 'date'], ascending=[True, True])
@@ -692,10 +1041,10 @@ if disable_filter_asset == False:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'quarter_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'quarter_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_code', 'quarter_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -713,7 +1062,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -740,7 +1089,7 @@ if disable_filter_asset == False:
             .add_params(hover)
         )
         
-        combo_line_chart_1 = line_chart_1 + points + tooltips
+        combo_line_chart_1 = with_forecast(line_chart_1 + points + tooltips, 'asset_code', option_asset, 'Quarter')
         
         # Brushing selection to help better view of the bar chart
         brush = alt.selection_interval(encodings=['x'], name='brush', empty=False)
@@ -779,16 +1128,22 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
+        st.caption(f'The dashed line and band are the forecast cost of all products with its 10th to 90th percentile range, for the {TOP_ASSETS} assets with the highest spend over the last 12 months.')
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_quarterly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Semester':
         db_search_filtered = db_search[db_search['asset_code'].isin(option_asset)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_code', 'date'], ascending=[True, True])
@@ -803,10 +1158,10 @@ if disable_filter_asset == False:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'semester_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'semester_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_code', 'semester_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -824,7 +1179,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -890,16 +1245,21 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_semester_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Yearly':
         db_search_filtered = db_search[db_search['asset_code'].isin(option_asset)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_code', 'date'], ascending=[True, True])
@@ -914,10 +1274,10 @@ if disable_filter_asset == False:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'reset_hm', 'year_column', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'asset_code', 'year_column', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_code', 'year_column'], ascending=[True, True])
         
         # Chart Making
@@ -935,7 +1295,7 @@ if disable_filter_asset == False:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_code')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1001,18 +1361,92 @@ if disable_filter_asset == False:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_code', option_asset, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
         st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+        st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
         st.altair_chart(combo, use_container_width=True)
 
         
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='asset_yearly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
 # --Grouped by Categories
 else:
+    # --Charts go through a placeholder so an approximate preview can be swapped for the exact charts
+    chart_placeholder = st.empty()
+    
+    selected_row_count = category_row_counts.reindex(option_category).fillna(0).sum()
+    if selected_row_count > APPROX_ROW_THRESHOLD:
+        period_column = PERIOD_COLUMNS[option_date]
+        
+        # --Apply the same filters as the exact computation, but on the stratified sample
+        db_search_sample = load_stratified_sample(data_version, db_search)
+        db_search_sample = db_search_sample[db_search_sample['asset_category'].isin(option_category)]
+        if option_date == 'by date' and len(date_range) > 0:
+            start_datetime = datetime.combine(date_range[0], datetime.min.time())
+            end_datetime = datetime.combine(date_range[1], datetime.max.time()) if len(date_range) == 2 else datetime.today()
+            db_search_sample = db_search_sample[(db_search_sample['date'] >= start_datetime) & (db_search_sample['date'] <= end_datetime)]
+        
+        approx_price = estimate_totals(
+            db_search_sample[(db_search_sample['source'] == 'good_consume') & (db_search_sample['product_name'].isin(option_product))],
+            ['source', 'asset_category', period_column], 'total_price'
+        )
+        approx_hour_meter = estimate_totals(
+            db_search_sample[db_search_sample['source'] == 'hm_record'].assign(hour_meter_per_date=lambda rows: rows['corrected_hours']),
+            ['source', 'asset_category', period_column], 'hour_meter_per_date'
+        )
+        
+        with chart_placeholder.container():
+            st.warning(f'Approximate preview from a stratified sample of {len(db_search_sample)} rows out of {int(selected_row_count)}, the shaded areas are 95% bounds. Exact charts are being computed...', icon="⏳")
+            
+            # --Estimated cost per period with its bounds
+            approx_base = alt.Chart(approx_price).encode(
+                x=alt.X(f'{period_column}:O', title=None, sort=alt.SortField(field=period_column, order='ascending')),
+                color=alt.Color('asset_category')
+            )
+            approx_band = approx_base.mark_area(opacity=0.2).encode(
+                y=alt.Y('total_price_lower:Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
+                y2='total_price_upper:Q'
+            )
+            approx_line = approx_base.mark_line(strokeDash=[4, 2]).encode(
+                y=alt.Y('total_price:Q', title=None),
+                tooltip=[
+                    alt.Tooltip(period_column, title='Period'),
+                    alt.Tooltip('asset_category', title='Asset Category'),
+                    alt.Tooltip('total_price', title='Estimated Total Price', format=',.0f'),
+                    alt.Tooltip('total_price_lower', title='Lower Bound', format=',.0f'),
+                    alt.Tooltip('total_price_upper', title='Upper Bound', format=',.0f')
+                ]
+            )
+            st.altair_chart((approx_band + approx_line).properties(title='Asset(s) Cost Trend (approximate)', height=400), use_container_width=True)
+            
+            # --Estimated hour meter per period with its bounds
+            approx_hm_base = alt.Chart(approx_hour_meter).encode(
+                x=alt.X(f'{period_column}:O', title=None, sort=alt.SortField(field=period_column, order='ascending')),
+                color=alt.Color('asset_category')
+            )
+            approx_bar = approx_hm_base.mark_bar(opacity=0.6).encode(
+                y=alt.Y('hour_meter_per_date:Q', title=None),
+                tooltip=[
+                    alt.Tooltip(period_column, title='Period'),
+                    alt.Tooltip('asset_category', title='Asset Category'),
+                    alt.Tooltip('hour_meter_per_date', title='Estimated Hour Meter', format=',.0f'),
+                    alt.Tooltip('hour_meter_per_date_lower', title='Lower Bound', format=',.0f'),
+                    alt.Tooltip('hour_meter_per_date_upper', title='Upper Bound', format=',.0f')
+                ]
+            )
+            approx_error = approx_hm_base.mark_rule().encode(
+                y='hour_meter_per_date_lower:Q',
+                y2='hour_meter_per_date_upper:Q'
+            )
+            st.altair_chart((approx_bar + approx_error).properties(title='Asset(s) Hour Meter Trend (approximate)', height=400), use_container_width=True)
+    
     if option_date == 'by date':
         # --make a new dataframe for the filtered dataframe called db_search_filtered
         if len(date_range) == 2:
@@ -1048,10 +1482,10 @@ else:
         db_search_filtered['date_only'] = db_search_filtered['date'].dt.date
             
         # --make a new dataframe for the chart for convenience
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'date_only', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'date_only', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'max'
-        })        
+            'corrected_hours':'max'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})        
         grouped_df['date_only'] = grouped_df['date_only'].astype(str)
         
         # Chart Making
@@ -1069,7 +1503,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1133,16 +1567,22 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_daily_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Weekly':
         db_search_filtered = db_search[db_search['asset_category'].isin(option_category)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_category', 'date'], ascending=[True, True])
@@ -1157,10 +1597,10 @@ else:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'week_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'week_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_category', 'week_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -1178,7 +1618,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1242,16 +1682,22 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_weekly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Monthly':
         db_search_filtered = db_search[db_search['asset_category'].isin(option_category)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_category', 'date'], ascending=[True, True])
@@ -1266,10 +1712,10 @@ else:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'month_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'month_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_category', 'month_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -1287,7 +1733,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1313,7 +1759,7 @@ else:
             .add_params(hover)
         )
         
-        combo_line_chart_1 = line_chart_1 + points + tooltips
+        combo_line_chart_1 = with_forecast(line_chart_1 + points + tooltips, 'asset_category', option_category, 'Monthly')
         
         # Brushing selection to help better view of the bar chart
         brush = alt.selection_interval(encodings=['x'], name='brush', empty=False)
@@ -1351,16 +1797,23 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.caption('The dashed line and band are the forecast cost of all products with its 10th to 90th percentile range.')
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_monthly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Quarter':
         db_search_filtered = db_search[db_search['asset_category'].isin(option_category)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_category', 'date'], ascending=[True, True])
@@ -1375,10 +1828,10 @@ else:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'quarter_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'quarter_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_category', 'quarter_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -1396,7 +1849,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1422,7 +1875,7 @@ else:
             .add_params(hover)
         )
         
-        combo_line_chart_1 = line_chart_1 + points + tooltips
+        combo_line_chart_1 = with_forecast(line_chart_1 + points + tooltips, 'asset_category', option_category, 'Quarter')
         
         # Brushing selection to help better view of the bar chart
         brush = alt.selection_interval(encodings=['x'], name='brush', empty=False)
@@ -1460,16 +1913,23 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.caption('The dashed line and band are the forecast cost of all products with its 10th to 90th percentile range.')
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_quarterly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Semester':
         db_search_filtered = db_search[db_search['asset_category'].isin(option_category)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_category', 'date'], ascending=[True, True])
@@ -1484,10 +1944,10 @@ else:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'semester_column_1', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'semester_column_1', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_category', 'semester_column_1'], ascending=[True, True])
         
         # Chart Making
@@ -1505,7 +1965,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1569,16 +2029,22 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
 
             
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_semester_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
     elif option_date == 'Yearly':
         db_search_filtered = db_search[db_search['asset_category'].isin(option_category)]
         db_search_filtered = db_search_filtered.sort_values(by=['asset_category', 'date'], ascending=[True, True])
@@ -1593,10 +2059,10 @@ else:
         db_search_filtered = pd.concat([hour_meter_rows, good_consume_rows])
         
         # Making a New DataFrame for Interactive Chart
-        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'reset_hm', 'year_column', 'product_name'], as_index=False, dropna=False).agg({
+        grouped_df = db_search_filtered.groupby(['source', 'asset_category', 'year_column', 'product_name'], as_index=False, dropna=False).agg({
             'total_price':'sum',
-            'hour_meter_per_date':'sum'
-        })
+            'corrected_hours':'sum'
+        }).rename(columns={'corrected_hours': 'hour_meter_per_date'})
         grouped_df = grouped_df.sort_values(by=['asset_category', 'year_column'], ascending=[True, True])
         
         # Chart Making
@@ -1614,7 +2080,7 @@ else:
 
         # --The line chart of the total price of assets
         line_chart_1 = base.mark_line().encode(
-            y=alt.Y('sum(total_price):Q', title=None),
+            y=alt.Y('sum(total_price):Q', title=None, axis=alt.Axis(labelExpr=price_expr())),
             color=alt.Color('asset_category')
         ).properties(
             title='Asset(s) Cost Trend',
@@ -1678,12 +2144,18 @@ else:
         # --The label at the top of the bar_chart_2 to help distinguished number faster between bars
         label_bar_chart_2 = bar_chart_2.mark_text(baseline='bottom')
         
+        # --Making annotation for the bar chart if User reset the hour meter value
+        chart_annotation = reset_annotation('asset_category', option_category, option_date, grouped_df)
+        
+        combo_bar_chart_1 = bar_chart_1 + chart_annotation
+        
         combo = (line_chart_1 + bar_chart_1).resolve_scale(y='independent').properties(title='Asset Maintenance Cost and Hour Meter Trend')
 
         # Layout
-        st.altair_chart(combo_line_chart_1, use_container_width=True)
-        st.altair_chart(bar_chart_1 | (bar_chart_2+label_bar_chart_2))
-        st.altair_chart(combo, use_container_width=True)
+        with chart_placeholder.container():
+            st.altair_chart(combo_line_chart_1, use_container_width=True)
+            st.altair_chart(combo_bar_chart_1 | (bar_chart_2+label_bar_chart_2))
+            st.altair_chart(combo, use_container_width=True)
                 
         st.subheader("Detailed View :")
-        st.dataframe(grouped_df.reset_index(drop=True), use_container_width=True)
+        detailed_view(grouped_df, key='category_yearly_view', formatters={'total_price': format_price, 'hour_meter_per_date': format_number})
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.resets import corrected_hours
+
+# Period column of union_hm_gc for every option of the 'Filter Date' selectbox
+PERIOD_COLUMNS = {
+    'by date': 'date_only',
+    'Weekly': 'week_column_1',
+    'Monthly': 'month_column_1',
+    'Quarter': 'quarter_column_1',
+    'Semester': 'semester_column_1',
+    'Yearly': 'year_column'
+}
+
+
+def period_aggregate(df, period_column, keys=('asset_category', 'asset_code')):
+    # --Maintenance cost and hours worked per key and period, one row per (key, period)
+    keys = list(keys)
+    if period_column == 'date_only' and 'date_only' not in df.columns:
+        df = df.assign(date_only=df['date'].dt.date.astype(str))
+
+    good_consume_rows = df[df['source'] == 'good_consume']
+    hour_meter_rows = df[df['source'] == 'hm_record']
+    # --Hours worked net of hour meter resets, as in the charts; computed here when the frame does not carry them
+    if 'corrected_hours' not in hour_meter_rows.columns:
+        hour_meter_rows = hour_meter_rows.assign(corrected_hours=corrected_hours(hour_meter_rows))
+    maintenance_cost = good_consume_rows.groupby(keys + [period_column], dropna=False)['total_price'].sum()
+    work_hours = hour_meter_rows.groupby(keys + [period_column], dropna=False)['corrected_hours'].sum()
+
+    aggregate = pd.concat([maintenance_cost.rename('maintenance_cost'), work_hours.rename('work_hours')], axis=1)
+    aggregate = aggregate.fillna(0).astype('float64')
+    aggregate['cost_per_hour'] = cost_per_hour(aggregate['maintenance_cost'].to_numpy(), aggregate['work_hours'].to_numpy())
+    aggregate = aggregate.reset_index().rename(columns={period_column: 'period'})
+    return aggregate.sort_values(keys + ['period'], ignore_index=True)
+
+
+def cost_per_hour(maintenance_cost, work_hours):
+    # --Undefined for periods without any recorded work hour
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(work_hours > 0, maintenance_cost / work_hours, np.nan)
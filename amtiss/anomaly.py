@@ -0,0 +1,90 @@
+import warnings
+
+import numpy as np
+
+from amtiss.aggregates import PERIOD_COLUMNS, period_aggregate
+
+# Periods before the scored one an asset is compared with, and how many of them have to have hours
+ROLLING_PERIODS = 8
+MIN_PERIODS = 3
+
+# Robust z-score above which a period is flagged, only costs above the norm count as anomalies
+Z_THRESHOLD = 3.5
+
+# Scales a median absolute deviation to a standard deviation of normal data
+MAD_SCALE = 1.4826
+
+# Lowest spread a median is compared with, as a share of the median, so a few near identical
+# periods do not turn an ordinary change into a huge score
+MIN_RELATIVE_SPREAD = 0.1
+
+ANOMALY_KEYS = ['asset_category', 'asset_code']
+
+
+def _robust_z(values, center, spread):
+    spread = np.fmax(spread, MIN_RELATIVE_SPREAD * np.abs(center))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(spread > 0, (values - center) / spread, np.nan)
+
+
+def _trailing_windows(values, group_codes, window):
+    # --(rows, window) matrix of the previous `window` values of the same group, NaN where the group
+    # --has fewer previous values; rows must be sorted by group then period
+    n = len(values)
+    lag = np.arange(1, window + 1)
+    source = np.arange(n)[:, None] - lag[None, :]
+    valid = source >= 0
+    source = np.where(valid, source, 0)
+    valid &= group_codes[source] == group_codes[:, None]
+    return np.where(valid, values[source], np.nan)
+
+
+def _spread(windows, center):
+    # --Scaled MAD of every window, the scaled mean absolute deviation when more than half the
+    # --window shares one value and the MAD is zero
+    deviation = np.abs(windows - center[:, None])
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        # --Windows without any value give NaN, numpy warns about each of them
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mad = MAD_SCALE * np.nanmedian(deviation, axis=1)
+        mean_deviation = 1.2533 * np.nanmean(deviation, axis=1)
+    return np.where(mad > 0, mad, mean_deviation)
+
+
+def score_anomalies(aggregate, window=ROLLING_PERIODS, min_periods=MIN_PERIODS):
+    # --Cost per hour of every (asset, period) scored against the asset's own previous periods and
+    # --against the other assets of its category in the same period
+    scored = aggregate.dropna(subset=['cost_per_hour']).sort_values(ANOMALY_KEYS + ['period'], ignore_index=True)
+    values = scored['cost_per_hour'].to_numpy(dtype='float64')
+
+    # --Own history: rolling median / MAD of the previous periods
+    group_codes = scored.groupby(ANOMALY_KEYS, sort=False, dropna=False).ngroup().to_numpy()
+    windows = _trailing_windows(values, group_codes, window)
+    enough = (~np.isnan(windows)).sum(axis=1) >= min_periods
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        rolling_median = np.where(enough, np.nanmedian(windows, axis=1), np.nan)
+    scored['rolling_median'] = rolling_median
+    scored['robust_z'] = _robust_z(values, rolling_median, _spread(windows, rolling_median))
+
+    # --Peers: median / MAD over the assets of the same category in the same period
+    peers = scored.groupby(['asset_category', 'period'], dropna=False)['cost_per_hour']
+    peer_median = peers.transform('median').to_numpy()
+    peer_count = peers.transform('size').to_numpy()
+    peer_mad = MAD_SCALE * (scored['cost_per_hour'] - peer_median).abs().groupby(
+        [scored['asset_category'], scored['period']], dropna=False
+    ).transform('median').to_numpy()
+    scored['peer_median'] = np.where(peer_count >= min_periods, peer_median, np.nan)
+    scored['peer_z'] = np.where(peer_count >= min_periods, _robust_z(values, peer_median, peer_mad), np.nan)
+
+    scored['score'] = np.fmax(scored['robust_z'].to_numpy(), scored['peer_z'].to_numpy())
+    scored['flagged'] = scored['score'] > Z_THRESHOLD
+    return scored
+
+
+def fleet_anomalies(df):
+    # --Scores of every asset for every granularity of the 'Filter Date' selectbox
+    return {
+        option: score_anomalies(period_aggregate(df, period_column))
+        for option, period_column in PERIOD_COLUMNS.items()
+    }
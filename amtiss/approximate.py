@@ -0,0 +1,65 @@
+import numpy as np
+
+# Selections bigger than this many raw rows get an approximate chart first
+APPROX_ROW_THRESHOLD = 200000
+
+# Size of the stratified sample kept next to the full data, and the minimum rows drawn per stratum
+SAMPLE_ROWS = 50000
+MIN_STRATUM_ROWS = 30
+
+# --z value of the two sided 95% bounds
+Z_95 = 1.96
+
+
+def stratified_sample(df, strata, sample_rows=SAMPLE_ROWS, min_rows=MIN_STRATUM_ROWS, seed=0):
+    # --Same sampling fraction in every stratum, small strata are kept with at least min_rows rows
+    fraction = min(1.0, sample_rows / max(len(df.index), 1))
+    stratum_size = df.groupby(strata, dropna=False, observed=True)[strata[0]].transform('size').to_numpy()
+    stratum_sampled = np.minimum(stratum_size, np.maximum(np.ceil(stratum_size * fraction), min_rows)).astype('int64')
+
+    # --Shuffle once, then keep the first rows of each stratum in the shuffled order
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(df.index))
+    shuffled = df.iloc[order]
+    rank = shuffled.groupby(strata, dropna=False, observed=True).cumcount().to_numpy()
+    keep = rank < stratum_sampled[order]
+
+    sample = shuffled[keep].copy()
+    sample['stratum_size'] = stratum_size[order][keep]
+    sample['stratum_sampled'] = stratum_sampled[order][keep]
+    return sample.sort_index()
+
+
+def estimate_totals(sample, keys, value, z=Z_95):
+    # --Domain totals under stratified sampling, keys must contain the strata columns
+    # --Each row stands for stratum_size / stratum_sampled rows of the full data
+    y = sample[value].fillna(0).to_numpy(dtype='float64')
+    work = sample[keys].copy()
+    work['y'] = y
+    work['y2'] = y * y
+    grouped = work.groupby(keys, dropna=False, observed=True).agg(
+        s1=('y', 'sum'),
+        s2=('y2', 'sum')
+    )
+    strata = sample.groupby(keys, dropna=False, observed=True).agg(
+        big_n=('stratum_size', 'first'),
+        small_n=('stratum_sampled', 'first')
+    )
+    grouped = grouped.join(strata)
+
+    big_n = grouped['big_n'].to_numpy(dtype='float64')
+    small_n = grouped['small_n'].to_numpy(dtype='float64')
+    s1 = grouped['s1'].to_numpy()
+    s2 = grouped['s2'].to_numpy()
+
+    # --Variance of the domain indicator variable over the whole stratum sample
+    variance = np.where(small_n > 1, (s2 - s1 * s1 / small_n) / np.maximum(small_n - 1, 1), 0)
+    variance = np.maximum(variance, 0)
+    standard_error = big_n * np.sqrt((1 - small_n / big_n) * variance / small_n)
+
+    estimate = big_n / small_n * s1
+    result = grouped.index.to_frame(index=False)
+    result[value] = estimate
+    result[f'{value}_lower'] = np.maximum(estimate - z * standard_error, 0)
+    result[f'{value}_upper'] = estimate + z * standard_error
+    return result
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+class ConsumeIndex:
+    # Consume id -> assignment attributes, built once per data load
+    # --ids are kept sorted so a lookup is a binary search returning integer positions, joins are
+    # --then gathers on numpy arrays instead of dedup + merge on wide frames
+    # --every attribute array ends with an empty slot, so position -1 (unknown id) gathers NaN/NaT
+
+    def __init__(self, data):
+        rows = data.loc[data['consume_id_assignment'].notna(), ['source', 'consume_id_assignment', 'due_date', 'fix_hm_record']]
+        due_date = pd.to_datetime(rows['due_date'], errors='coerce').to_numpy(dtype='datetime64[ns]')
+        fix_hm_record = rows['fix_hm_record'].to_numpy(dtype='float64')
+        codes, ids = pd.factorize(rows['consume_id_assignment'], sort=True)
+        self.ids = np.asarray(ids)
+
+        # --Latest due_date and highest fix_hm_record of every id, over every source
+        latest = np.full(len(self.ids) + 1, np.iinfo('int64').min)
+        due_known = ~np.isnat(due_date)
+        np.maximum.at(latest, codes[due_known], due_date[due_known].view('int64'))
+        self.latest_due_date = latest.view('datetime64[ns]')
+        self.max_fix_hm_record = np.full(len(self.ids) + 1, np.nan)
+        fix_known = ~np.isnan(fix_hm_record)
+        np.fmax.at(self.max_fix_hm_record, codes[fix_known], fix_hm_record[fix_known])
+
+        # --Distinct (due_date, fix_hm_record) pairs recorded on good_consume rows, stored as one
+        # --contiguous run per id so an id expands to all of its pairs
+        services = pd.DataFrame({
+            'code': codes,
+            'due_date': rows['due_date'].to_numpy(),
+            'fix_hm_record': fix_hm_record
+        })[(rows['source'] == 'good_consume').to_numpy()].drop_duplicates().sort_values('code', kind='stable')
+        self.offsets = np.searchsorted(services['code'].to_numpy(), np.arange(len(self.ids) + 1))
+        self.service_due_date = np.append(services['due_date'].to_numpy(dtype=object), None)
+        self.service_fix_hm_record = np.append(services['fix_hm_record'].to_numpy(), np.nan)
+
+    def positions(self, consume_ids):
+        # --Position of every consume id in the index, -1 when the id is unknown
+        consume_ids = np.asarray(consume_ids)
+        known = pd.notna(consume_ids)
+        found = np.searchsorted(self.ids, consume_ids[known])
+        found = np.minimum(found, len(self.ids) - 1)
+        position = np.full(len(consume_ids), -1)
+        if len(self.ids):
+            position[known] = np.where(self.ids[found] == consume_ids[known], found, -1)
+        return position
+
+    def join_services(self, df, on='consume_id_good_consume'):
+        # --Left join of df with the good_consume assignment pairs of its consume id, an id with
+        # --several pairs repeats its row once per pair and an unknown id keeps one empty row
+        position = self.positions(df[on].to_numpy())
+        run_start = np.where(position >= 0, self.offsets[position], 0)
+        matches = np.where(position >= 0, self.offsets[position + 1] - run_start, 0)
+        repeat = np.maximum(matches, 1)
+
+        row = np.repeat(np.arange(len(df.index)), repeat)
+        step = np.arange(len(row)) - np.repeat(np.cumsum(repeat) - repeat, repeat)
+        service = np.where(np.repeat(matches > 0, repeat), np.repeat(run_start, repeat) + step, -1)
+
+        joined = df.iloc[row].reset_index(drop=True)
+        joined['consume_id_assignment'] = np.where(service >= 0, joined[on].to_numpy(), np.nan)
+        joined['due_date'] = self.service_due_date[service]
+        joined['fix_hm_record'] = self.service_fix_hm_record[service]
+        return joined
+
+    def attach_latest(self, df, on='consume_id_good_consume'):
+        # --Latest due_date and highest fix_hm_record of the consume id of every row, ids no row refers
+        # --to are appended as rows of their own, like the outer merge this replaces
+        position = self.positions(df[on].to_numpy())
+        attached = df.copy()
+        attached['consume_id_assignment'] = np.where(position >= 0, df[on].to_numpy(), np.nan)
+        attached['latest_product_maintained_at'] = self.latest_due_date[position]
+        attached['maintained_hour_meter'] = self.max_fix_hm_record[position]
+
+        unused = np.ones(len(self.ids), dtype=bool)
+        unused[position[position >= 0]] = False
+        orphans = pd.DataFrame({
+            'consume_id_assignment': self.ids[unused],
+            'latest_product_maintained_at': self.latest_due_date[:-1][unused],
+            'maintained_hour_meter': self.max_fix_hm_record[:-1][unused]
+        })
+        return pd.concat([attached, orphans], ignore_index=True)
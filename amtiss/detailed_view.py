@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Server side window over an aggregated table, only the visible page is sent to the browser
+
+
+def search_mask(df, query):
+    # --Case insensitive substring match over every text column of the table
+    if not query:
+        return None
+    mask = np.zeros(len(df.index), dtype=bool)
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_datetime64_any_dtype(df[col]):
+            continue
+        mask |= df[col].astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+    return mask
+
+
+def table_window(df, search='', sort_by=None, ascending=True, page=0, page_size=50):
+    # --Positions of the rows that survive the search, without copying the table
+    mask = search_mask(df, search)
+    positions = np.arange(len(df.index)) if mask is None else np.flatnonzero(mask)
+    total_rows = len(positions)
+
+    # --Sort only the matching positions by the chosen column
+    if sort_by is not None and total_rows > 0:
+        keys = df[sort_by].to_numpy()[positions]
+        order = pd.Series(keys).sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+        positions = positions[order]
+
+    start = page * page_size
+    window = df.iloc[positions[start:start + page_size]].reset_index(drop=True)
+    return window, total_rows
+
+
+def detailed_view(df, key='detailed_view', page_size=50, formatters=None):
+    page_key = f'{key}_page'
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 0
+
+    def reset_page():
+        st.session_state[page_key] = 0
+
+    cols_table = st.columns([0.5, 0.3, 0.2])
+    with cols_table[0]:
+        search = st.text_input('Search', key=f'{key}_search', on_change=reset_page, placeholder='Type to search the table')
+    with cols_table[1]:
+        sort_by = st.selectbox('Sort by', ['(none)'] + list(df.columns), key=f'{key}_sort_by', on_change=reset_page)
+    with cols_table[2]:
+        sort_order = st.radio('Order', ['Ascending', 'Descending'], key=f'{key}_order', horizontal=True, on_change=reset_page)
+
+    window, total_rows = table_window(
+        df,
+        search=search,
+        sort_by=None if sort_by == '(none)' else sort_by,
+        ascending=sort_order == 'Ascending',
+        page=st.session_state[page_key],
+        page_size=page_size
+    )
+
+    # --The filters above may shrink the table under the current page
+    total_pages = max((total_rows + page_size - 1) // page_size, 1)
+    if st.session_state[page_key] >= total_pages:
+        st.session_state[page_key] = total_pages - 1
+        window, total_rows = table_window(
+            df,
+            search=search,
+            sort_by=None if sort_by == '(none)' else sort_by,
+            ascending=sort_order == 'Ascending',
+            page=st.session_state[page_key],
+            page_size=page_size
+        )
+
+    # --Display formatting is applied to the visible page only
+    for col, formatter in (formatters or {}).items():
+        window[col] = formatter(window[col])
+
+    st.dataframe(window, use_container_width=True)
+
+    def next_page():
+        st.session_state[page_key] += 1
+
+    def previous_page():
+        st.session_state[page_key] -= 1
+
+    start_row = st.session_state[page_key] * page_size
+    cols_button = st.columns([0.11, 0.11, 0.78])
+    with cols_button[0]:
+        st.button('⏮️ Previous', key=f'{key}_previous', on_click=previous_page, disabled=st.session_state[page_key] == 0)
+    with cols_button[1]:
+        st.button('Next ⏭️', key=f'{key}_next', on_click=next_page, disabled=start_row + page_size >= total_rows)
+    with cols_button[2]:
+        st.write(f'Rows {min(start_row + 1, total_rows)}-{min(start_row + page_size, total_rows)} of {total_rows}, page {st.session_state[page_key] + 1} of {total_pages}')
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Value column summarised for each source of union_hm_gc
+SOURCE_VALUES = {
+    'good_consume': 'total_price',
+    'hm_record': 'hour_meter_per_date'
+}
+
+# Sort orders offered by the Data Distribution panel, as (statistic, ascending)
+SORT_ORDERS = {
+    'Highest average': ('mean', False),
+    'Highest median': ('median', False),
+    'Highest p90': ('p90', False),
+    'Widest spread (IQR)': ('iqr', False),
+    'Most assets': ('distinct_asset_codes', False),
+    'Most records': ('count', False),
+    'Category name': ('asset_category', True)
+}
+
+
+def _segment_quantile(values, starts, counts, q):
+    # --Linear interpolation like numpy's default, read straight from the sorted segments
+    position = starts + q * (counts - 1)
+    lower = np.floor(position).astype('int64')
+    upper = np.minimum(lower + 1, starts + counts - 1)
+    fraction = position - lower
+    return values[lower] * (1 - fraction) + values[upper] * fraction
+
+
+def category_statistics(df, value, group='asset_category'):
+    # --One sort by (category, value), every statistic is then read per contiguous segment; rows without
+    # --a category are left out like the groupby this replaces did
+    rows = df[[group, 'asset_code', value]].dropna(subset=[group, value])
+    codes, labels = pd.factorize(rows[group], sort=True)
+    values = rows[value].to_numpy(dtype='float64')
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+
+    counts = np.bincount(codes, minlength=len(labels))
+    present = counts > 0
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[present]
+    counts = counts[present]
+
+    q1 = _segment_quantile(values, starts, counts, 0.25)
+    q3 = _segment_quantile(values, starts, counts, 0.75)
+    stats = pd.DataFrame({
+        group: np.asarray(labels)[present],
+        'count': counts,
+        'distinct_asset_codes': rows.groupby(group)['asset_code'].nunique().reindex(np.asarray(labels)[present]).to_numpy(),
+        'mean': np.add.reduceat(values, starts) / counts if len(values) else np.array([]),
+        'min': values[starts],
+        'q1': q1,
+        'median': _segment_quantile(values, starts, counts, 0.5),
+        'q3': q3,
+        'p90': _segment_quantile(values, starts, counts, 0.9),
+        'max': values[starts + counts - 1],
+        'iqr': q3 - q1
+    })
+    # --Box plot whiskers, 1.5 IQR clipped to the observed range
+    stats['whisker_low'] = np.maximum(stats['q1'] - 1.5 * stats['iqr'], stats['min'])
+    stats['whisker_high'] = np.minimum(stats['q3'] + 1.5 * stats['iqr'], stats['max'])
+    return stats
+
+
+def distribution_rankings(df):
+    # --Statistics per source, each one pre sorted for every sort order so a page is a plain slice
+    rankings = {}
+    for source, value in SOURCE_VALUES.items():
+        stats = category_statistics(df[df['source'] == source], value)
+        rankings[source] = {
+            name: stats.sort_values(column, ascending=ascending, kind='stable', ignore_index=True)
+            for name, (column, ascending) in SORT_ORDERS.items()
+        }
+    return rankings
@@ -0,0 +1,194 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from amtiss.storage import data_path, read_json, read_parquet, write_json, write_parquet
+
+# Months forecast after the latest month of records, enough for the next full quarter
+HORIZON_MONTHS = 6
+
+# Series with fewer months are not forecast, month of year effects are only fitted from two years on
+MIN_MONTHS = 12
+SEASONAL_MONTHS = 24
+
+# Share of the trend kept every month ahead, an undamped trend runs away within a few months
+DAMPING = 0.9
+
+# Forecast band, 10th to 90th percentile of a normal error on the monthly cost
+BAND_Z = 1.2816
+
+# Assets with the highest spend over the last 12 months get a forecast of their own
+TOP_ASSETS = 100
+
+SERIES_KEYS = ['level', 'asset_category', 'asset_code']
+
+SEASONAL_COLUMNS = [f'season_{month:02d}' for month in range(1, 13)]
+
+FORECAST_COLUMNS = SERIES_KEYS + ['month', 'forecast', 'sigma', 'lower', 'upper']
+
+# Period column of union_hm_gc for every forecast frequency, with the label formats it may use
+FREQUENCIES = {
+    'Monthly': ('M', 'month_column_1', ['%Y-%m', '%Y-%m-01', '%Y%m', '%b %Y', '%B %Y', '%m-%Y', '%m/%Y']),
+    'Quarter': ('Q', 'quarter_column_1', ['%Y-Q%q', '%YQ%q', '%Y Q%q', 'Q%q-%Y', 'Q%q %Y', '%Y-%q'])
+}
+
+
+def monthly_costs(df, top_assets=TOP_ASSETS):
+    # --Monthly maintenance cost of every category and of the highest spending assets, one row per
+    # --(series, month) with the months without any purchase filled with zero; months are monthly
+    # --period ordinals (months since 1970-01) so they can be counted and stored as integers
+    good_consume_rows = df[df['source'] == 'good_consume'].dropna(subset=['date'])
+    month = (good_consume_rows['date'].dt.year - 1970) * 12 + good_consume_rows['date'].dt.month - 1
+    last_month = month.max()
+    by_asset = good_consume_rows.groupby(['asset_category', 'asset_code', month.rename('month')], dropna=False)['total_price'].sum()
+
+    recent = by_asset[by_asset.index.get_level_values('month') > last_month - 12]
+    top = recent.groupby(level=['asset_category', 'asset_code'], dropna=False).sum().nlargest(top_assets).index
+    assets = by_asset[by_asset.droplevel('month').index.isin(top)].reset_index().assign(level='asset_code')
+    categories = by_asset.groupby(level=['asset_category', 'month'], dropna=False).sum().reset_index().assign(level='asset_category', asset_code=None)
+    costs = pd.concat([categories, assets], ignore_index=True).rename(columns={'total_price': 'cost'})
+
+    # --Every series runs from its first month to the latest month of the fleet
+    first = costs.groupby(SERIES_KEYS, dropna=False)['month'].transform('min')
+    months = last_month - first + 1
+    series = costs.drop_duplicates(SERIES_KEYS)[SERIES_KEYS].assign(first=first, months=months).reset_index(drop=True)
+    filled = series.loc[series.index.repeat(series['months'])].reset_index(drop=True)
+    filled['month'] = filled['first'] + filled.groupby(SERIES_KEYS, dropna=False).cumcount().to_numpy()
+    filled = filled[SERIES_KEYS + ['month']].merge(costs, on=SERIES_KEYS + ['month'], how='left')
+    filled['cost'] = filled['cost'].fillna(0)
+    return filled.sort_values(SERIES_KEYS + ['month'], ignore_index=True)
+
+
+def fit_series(cost, first_month, horizon=HORIZON_MONTHS):
+    # --Least squares fit of the cost on a level, a linear trend and (with enough history) a month of
+    # --year effect; forecasts continue a damped trend from the latest month. The cost is not log
+    # --transformed, most asset series have months without any purchase and budgets add up means
+    y = cost
+    n = len(y)
+    t = np.arange(n + horizon)
+    month_of_year = (first_month + t) % 12
+    columns = [np.ones(n + horizon), t.astype('float64')]
+    if n >= SEASONAL_MONTHS:
+        columns += [(month_of_year == month).astype('float64') for month in range(1, 12)]
+    X = np.column_stack(columns)
+    beta = np.linalg.lstsq(X[:n], y, rcond=None)[0]
+    residual = y - X[:n] @ beta
+    sigma = np.sqrt((residual ** 2).sum() / max(n - X.shape[1], 1))
+
+    # --Ahead of the latest month the trend term grows by DAMPING^h instead of 1 per month
+    damped = X[n:].copy()
+    damped[:, 1] = n - 1 + np.cumsum(DAMPING ** np.arange(1, horizon + 1))
+    mu = np.fmax(damped @ beta, 0)
+    season = np.zeros(12)
+    season[1:] = beta[2:] if n >= SEASONAL_MONTHS else 0
+    params = {'months': n, 'intercept': beta[0], 'slope': beta[1], 'sigma': sigma, **dict(zip(SEASONAL_COLUMNS, season))}
+    forecast = {
+        'month': first_month + n + np.arange(horizon),
+        'forecast': mu,
+        'sigma': np.full(horizon, sigma),
+        'lower': np.fmax(mu - BAND_Z * sigma, 0),
+        'upper': mu + BAND_Z * sigma
+    }
+    return params, forecast
+
+
+def fit_fleet(costs):
+    # --Parameters and forecasts of every series with enough months; the fleet has one series per
+    # --category and TOP_ASSETS asset series, a few hundred small least squares fits, done in process
+    params = []
+    forecasts = []
+    for key, series in costs.groupby(SERIES_KEYS, sort=False, dropna=False):
+        if len(series.index) < MIN_MONTHS:
+            continue
+        fitted, forecast = fit_series(series['cost'].to_numpy(dtype='float64'), int(series['month'].iloc[0]))
+        params.append(dict(zip(SERIES_KEYS, key), **fitted))
+        forecasts.append(pd.DataFrame(forecast).assign(**dict(zip(SERIES_KEYS, key))))
+    params = pd.DataFrame(params, columns=SERIES_KEYS + ['months', 'intercept', 'slope', 'sigma'] + SEASONAL_COLUMNS)
+    forecasts = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame(columns=FORECAST_COLUMNS)
+    return params, forecasts[FORECAST_COLUMNS]
+
+
+def label_format(df, frequency):
+    # --Format of the period column of df for the frequency, None when none of the candidates reproduces
+    # --the column; forecasts labelled in another format would not line up with the charted periods
+    freq, column, formats = FREQUENCIES[frequency]
+    known = df[['date', column]].dropna().drop_duplicates(column).head(50)
+    known_periods = pd.PeriodIndex(known['date'].dt.to_period(freq))
+    for candidate in formats:
+        if (known_periods.strftime(candidate) == known[column].astype(str).to_numpy()).all():
+            return candidate
+    return None
+
+
+class ForecastStore:
+    # Monthly cost forecasts of every category and high spending asset, persisted with the fitted
+    # --parameters; refitted offline (python -m amtiss.forecast <union_hm_gc file>) and only when the
+    # --monthly costs changed since the last fit, the dashboards only look forecasts up
+
+    def __init__(self, name='forecasts'):
+        self.name = name
+        self.manifest = read_json(data_path(name, 'manifest.json'), default={'version': 0})
+        self.version = self.manifest['version']
+        self.params = read_parquet(data_path(name, 'params.parquet'))
+        self.forecasts = read_parquet(data_path(name, 'forecasts.parquet'))
+
+    def refresh(self, df):
+        # --Refit when the monthly costs differ from the fitted ones, returns whether it did
+        costs = monthly_costs(df)
+        snapshot = str(int(pd.util.hash_pandas_object(costs, index=False).sum()))
+        if snapshot == self.manifest.get('snapshot') and self.forecasts is not None:
+            return False
+
+        self.params, self.forecasts = fit_fleet(costs)
+        self.version += 1
+        write_parquet(self.params, data_path(self.name, 'params.parquet'))
+        write_parquet(self.forecasts, data_path(self.name, 'forecasts.parquet'))
+        self.manifest = {
+            'version': self.version,
+            'snapshot': snapshot,
+            'series': len(self.params.index),
+            'fitted_at': pd.Timestamp.now().isoformat(),
+            # --Period label formats of the fitted data, forecasts are labelled like its period columns
+            'label_formats': {frequency: label_format(df, frequency) for frequency in FREQUENCIES}
+        }
+        write_json(self.manifest, data_path(self.name, 'manifest.json'))
+        return True
+
+    def lookup(self, level, keys, frequency='Monthly'):
+        # --Forecasts of the given categories or asset codes, with the period label of the frequency;
+        # --months are summed into quarters, with independent monthly errors, and only quarters
+        # --forecast in full are kept. None when the label format of the frequency is not known
+        _, column, _ = FREQUENCIES[frequency]
+        label = self.manifest.get('label_formats', {}).get(frequency)
+        if label is None:
+            return None
+        forecasts = self.forecasts if self.forecasts is not None else pd.DataFrame(columns=FORECAST_COLUMNS)
+        forecasts = forecasts[(forecasts['level'] == level) & forecasts[level].isin(keys)]
+        forecasts = forecasts.assign(period=pd.PeriodIndex.from_ordinals(forecasts['month'].to_numpy(dtype='int64'), freq='M'))
+        if frequency == 'Monthly':
+            forecasts = forecasts.assign(**{column: pd.PeriodIndex(forecasts['period']).strftime(label)})
+            return forecasts.drop(columns=['month', 'period']).reset_index(drop=True)
+        forecasts = forecasts.assign(period=pd.PeriodIndex(forecasts['period']).asfreq('Q'), variance=forecasts['sigma'] ** 2)
+        quarters = forecasts.groupby(SERIES_KEYS + ['period'], dropna=False).agg(
+            months=('month', 'size'),
+            forecast=('forecast', 'sum'),
+            variance=('variance', 'sum')
+        ).reset_index()
+        quarters['sigma'] = np.sqrt(quarters['variance'])
+        quarters['lower'] = np.fmax(quarters['forecast'] - BAND_Z * quarters['sigma'], 0)
+        quarters['upper'] = quarters['forecast'] + BAND_Z * quarters['sigma']
+        quarters = quarters[quarters['months'] == 3]
+        quarters = quarters.assign(**{column: pd.PeriodIndex(quarters['period']).strftime(label)})
+        return quarters.drop(columns=['months', 'variance', 'period']).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    # --e.g. python -m amtiss.forecast union_hm_gc.parquet, any csv / parquet export of union_hm_gc
+    path = sys.argv[1]
+    columns = ['source', 'asset_category', 'asset_code', 'date', 'total_price'] + [column for _, column, _ in FREQUENCIES.values()]
+    df = pd.read_parquet(path, columns=columns) if path.endswith('.parquet') else pd.read_csv(path, usecols=columns)
+    df['date'] = pd.to_datetime(df['date'])
+    store = ForecastStore()
+    store.refresh(df)
+    print(store.manifest)
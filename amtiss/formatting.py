@@ -0,0 +1,72 @@
+import numpy as np
+
+# Indonesian style short scale, the first threshold the value reaches picks the unit
+UNITS = [
+    (1000000000000, 'T'),
+    (1000000000, 'M'),
+    (1000000, 'jt'),
+    (1000, 'rb'),
+]
+
+
+# --Two digit decimal parts, looked up instead of formatted one by one
+_DECIMALS = np.array([f'{i:02d}' for i in range(100)], dtype=object)
+
+
+def _format_scaled(values, prefix, plain_decimals):
+    values = np.atleast_1d(np.asarray(values, dtype='float64'))
+    divisor = np.ones(values.shape)
+    suffix = np.full(values.shape, '', dtype=object)
+    decimals = np.full(values.shape, plain_decimals)
+    # --Walk the thresholds from the smallest so the largest matching unit wins
+    for threshold, unit in reversed(UNITS):
+        hit = values >= threshold
+        divisor[hit] = threshold
+        suffix[hit] = f' {unit}'
+        decimals[hit] = 2
+
+    # --Split into whole and decimal parts with integer arithmetic, then glue the strings together; the
+    # --sign is kept for every negative value, like f-string formatting ('-0' for -0.3)
+    missing = ~np.isfinite(values)
+    scaled = np.where(missing, 0, np.abs(values / divisor))
+    units = np.where(decimals == 2, scaled * 100, scaled)
+    rounded = np.rint(units)
+    # --Values on or next to a .5 tie, or too large to be exact in float, are formatted one by one so they
+    # --round like f-string formatting of the exact binary value does
+    exact = (np.abs(units - np.floor(units) - 0.5) < 1e-6) | (units >= 2 ** 53)
+    rounded = np.where(exact, 0, rounded).astype('int64')
+    whole = np.where(decimals == 2, rounded // 100, rounded)
+    sign = np.where(np.signbit(values), '-', '').astype(object)
+    text = sign + whole.astype(str).astype(object)
+    text = np.where(decimals == 2, text + ',' + _DECIMALS[rounded % 100], text)
+    for i in np.flatnonzero(exact & ~missing):
+        text[i] = f'{values[i] / divisor[i]:.{decimals[i]}f}'.replace('.', ',')
+    return np.where(missing, '', prefix + text + suffix)
+
+
+def format_price(price):
+    # --Works for a single number as well as a whole column/array
+    formatted = _format_scaled(price, 'Rp ', 2)
+    return formatted[0] if np.ndim(price) == 0 else formatted
+
+
+def format_number(price):
+    formatted = _format_scaled(price, '', 0)
+    return formatted[0] if np.ndim(price) == 0 else formatted
+
+
+def _vega_expr(field, prefix, plain_format):
+    # --Same thresholds as above written as a Vega expression so the browser formats the numbers
+    expr = f"'{prefix}' + replace(format({field}, '{plain_format}'), '.', ',')"
+    for threshold, unit in reversed(UNITS):
+        scaled = f"'{prefix}' + replace(format({field} / {threshold}, '.2f'), '.', ',') + ' {unit}'"
+        expr = f"{field} >= {threshold} ? {scaled} : ({expr})"
+    return expr
+
+
+def price_expr(field='datum.value'):
+    return _vega_expr(field, 'Rp ', '.2f')
+
+
+def number_expr(field='datum.value'):
+    return _vega_expr(field, '', '.0f')
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.aggregates import cost_per_hour
+
+METRICS = {
+    'Maintenance Cost': 'maintenance_cost',
+    'Hours Worked': 'work_hours',
+    'Cost per Hour': 'cost_per_hour'
+}
+
+ROW_ORDERS = ['Similarity', 'Total', 'Name']
+
+# Row label of the records without an asset code or category
+UNKNOWN_ROW = '(unknown)'
+
+
+def _dense(aggregate, row_key, value):
+    # --(row, period) matrix built with integer codes instead of a pivot; factorize codes a missing key
+    # --as -1, which np.add.at would add into the last row or column, so missing keys get a row of their
+    # --own and rows without a period are left out
+    aggregate = aggregate[aggregate['period'].notna()]
+    row_codes, row_labels = pd.factorize(aggregate[row_key].fillna(UNKNOWN_ROW), sort=True)
+    column_codes, column_labels = pd.factorize(aggregate['period'], sort=True)
+    matrix = np.zeros((len(row_labels), len(column_labels)))
+    np.add.at(matrix, (row_codes, column_codes), aggregate[value].to_numpy(dtype='float64'))
+    return matrix, np.asarray(row_labels, dtype=str), np.asarray(column_labels, dtype=str)
+
+
+def _metric(cost, hours, metric):
+    if metric == 'maintenance_cost':
+        return cost
+    if metric == 'work_hours':
+        return hours
+    return cost_per_hour(cost, hours)
+
+
+def order_rows(cost, hours, metric, order):
+    values = _metric(cost, hours, metric)
+    if order == 'Name' or len(values) < 3:
+        return np.arange(len(values))
+    if order == 'Total':
+        totals = _metric(cost.sum(axis=1), hours.sum(axis=1), metric)
+        return np.argsort(-np.nan_to_num(totals, nan=-np.inf), kind='stable')
+
+    # --Similarity: rows scaled to their own peak, then sorted along the first principal component
+    # --so assets with the same seasonal shape end up next to each other
+    profile = np.nan_to_num(values)
+    peak = np.abs(profile).max(axis=1, keepdims=True)
+    profile = np.divide(profile, peak, out=np.zeros_like(profile), where=peak > 0)
+    profile = profile - profile.mean(axis=0)
+    left, _, _ = np.linalg.svd(profile, full_matrices=False)
+    return np.argsort(left[:, 0], kind='stable')
+
+
+def _bin_edges(size, max_bins):
+    # --Start index of every bin, consecutive items share a bin once there are more items than pixels
+    per_bin = max(int(np.ceil(size / max_bins)), 1)
+    return np.arange(0, size, per_bin)
+
+
+def _bin_labels(labels, edges, noun):
+    ends = np.append(edges[1:], len(labels)) - 1
+    return [
+        labels[start] if start == end else f'{labels[start]} … {labels[end]} ({end - start + 1} {noun})'
+        for start, end in zip(edges, ends)
+    ]
+
+
+def heatmap_matrix(aggregate, row_key, metric, order='Similarity', max_rows=200, max_columns=120, row_noun='assets'):
+    cost, row_labels, column_labels = _dense(aggregate, row_key, 'maintenance_cost')
+    hours, _, _ = _dense(aggregate, row_key, 'work_hours')
+    if len(row_labels) == 0:
+        return pd.DataFrame(columns=['row', 'period', 'value', 'row_rank', 'period_rank'])
+
+    row_order = order_rows(cost, hours, metric, order)
+    cost, hours, row_labels = cost[row_order], hours[row_order], row_labels[row_order]
+
+    # --Pixel level binning, sums are binned and the metric is derived afterwards
+    row_edges = _bin_edges(len(row_labels), max_rows)
+    column_edges = _bin_edges(len(column_labels), max_columns)
+    cost = np.add.reduceat(np.add.reduceat(cost, row_edges, axis=0), column_edges, axis=1)
+    hours = np.add.reduceat(np.add.reduceat(hours, row_edges, axis=0), column_edges, axis=1)
+    values = _metric(cost, hours, metric)
+
+    row_names = _bin_labels(row_labels, row_edges, row_noun)
+    period_names = _bin_labels(column_labels, column_edges, 'periods')
+    row_rank, period_rank = np.indices(values.shape)
+    return pd.DataFrame({
+        'row': np.asarray(row_names, dtype=object)[row_rank.ravel()],
+        'period': np.asarray(period_names, dtype=object)[period_rank.ravel()],
+        'value': values.ravel(),
+        'row_rank': row_rank.ravel(),
+        'period_rank': period_rank.ravel()
+    })
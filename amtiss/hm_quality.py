@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# Days without any reading after which an asset is flagged with a gap
+MAX_GAP_DAYS = 14
+
+# More hours than a day has cannot be worked in one day
+MAX_DAILY_HOURS = 24
+
+QUALITY_KEYS = ['asset_category', 'asset_code']
+
+# Checks of the scanner, the asset table has a count column for each of them
+CHECKS = {
+    'duplicates': 'More than one reading on the same day',
+    'negative': 'Negative hours without the reset_hm flag',
+    'too_large': f'More than {MAX_DAILY_HOURS} hours in a day',
+    'missing': 'Reading without hours',
+    'gaps': f'More than {MAX_GAP_DAYS} days without a reading'
+}
+
+
+def scan_rows(df):
+    # --Checks of every hm_record row, indexed like df; rows are compared with the previous reading of
+    # --the same asset in date order
+    hour_meter_rows = df[df['source'] == 'hm_record']
+    day = hour_meter_rows['date'].dt.normalize()
+    # --Missing categories and asset codes sort last instead of failing the comparison
+    keys = hour_meter_rows[QUALITY_KEYS].assign(day=day).reset_index(drop=True)
+    order = keys.sort_values(QUALITY_KEYS + ['day'], kind='stable').index.to_numpy()
+    rows = hour_meter_rows[QUALITY_KEYS].iloc[order].assign(day=day.iloc[order])
+
+    hours = hour_meter_rows['hour_meter_per_date'].iloc[order].to_numpy(dtype='float64')
+    reset = (hour_meter_rows['reset_hm'].iloc[order].astype(str).str.lower() == 'true').to_numpy()
+    codes = rows.groupby(QUALITY_KEYS, sort=False, dropna=False).ngroup().to_numpy()
+    same_asset = np.zeros(len(codes), dtype=bool)
+    same_asset[1:] = codes[1:] == codes[:-1]
+    gap_days = np.zeros(len(codes), dtype='int64')
+    gap_days[1:] = (rows['day'].to_numpy()[1:] - rows['day'].to_numpy()[:-1]) // np.timedelta64(1, 'D')
+    gap_days = np.where(same_asset, gap_days, 0)
+
+    rows['duplicates'] = same_asset & (gap_days == 0)
+    rows['negative'] = (hours < 0) & ~reset
+    rows['too_large'] = hours > MAX_DAILY_HOURS
+    rows['missing'] = np.isnan(hours)
+    rows['gaps'] = gap_days > MAX_GAP_DAYS
+    rows['gap_days'] = gap_days
+    # --A gap flags the asset, the reading after it is fine
+    rows['suspect'] = rows['duplicates'] | rows['negative'] | rows['too_large'] | rows['missing']
+    return rows
+
+
+def scan_assets(rows):
+    # --Reading count, count of every check and the longest gap of every asset, with the list of
+    # --checks it fails
+    assets = rows.groupby(QUALITY_KEYS, sort=False, dropna=False).agg(
+        readings=('day', 'size'),
+        first_day=('day', 'min'),
+        last_day=('day', 'max'),
+        longest_gap_days=('gap_days', 'max'),
+        suspect_rows=('suspect', 'sum'),
+        **{check: (check, 'sum') for check in CHECKS}
+    ).reset_index()
+    assets['suspect_share'] = assets['suspect_rows'] / assets['readings']
+    flags = pd.Series('', index=assets.index)
+    for check in CHECKS:
+        flags = flags + np.where(assets[check] > 0, f'{check}, ', '')
+    assets['flags'] = flags.str.removesuffix(', ')
+    assets['flagged'] = assets['flags'] != ''
+    return assets.sort_values(['suspect_rows', 'gaps'], ascending=False, ignore_index=True)
+
+
+def hour_meter_quality(df):
+    # --Row checks and asset table of the whole fleet, computed once per data load
+    rows = scan_rows(df)
+    return rows, scan_assets(rows)
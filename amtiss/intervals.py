@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.maintenance import SERVICE_KEYS
+from amtiss.storage import data_path, read_parquet, write_parquet
+
+# Service interval a status can be based on, as (label, column of IntervalEstimator.intervals())
+INTERVAL_BASES = {
+    'Mean': 'mean_service',
+    'Median': 'median_service',
+    'EWMA': 'ewma_service'
+}
+
+# Weight of the newest interval in the exponentially weighted moving average
+EWMA_ALPHA = 0.3
+
+# Quantile sketch: the latest WINDOW intervals of every product, kept in a ring buffer, quantiles are
+# read from it exactly; products see a few dozen services at most, where a binned sketch is too coarse
+WINDOW = 32
+SKETCH_COLUMNS = [f'interval_{i:02d}' for i in range(WINDOW)]
+
+STATE_COLUMNS = SERVICE_KEYS + ['product_name', 'count', 'total', 'ewma', 'last_fix_hm_record', 'last_service_at']
+
+
+class IntervalEstimator:
+    # Running service interval state per (asset, product): count, sum, EWMA, the latest intervals and
+    # the last service; a service is folded in once, so an update costs O(1) per new service
+    # --services on or before the last one already folded in are skipped, a corrected historical record
+    # --only takes effect after reset()
+
+    def __init__(self, name='service_intervals'):
+        self.name = name
+        state = read_parquet(data_path(name, 'state.parquet'))
+        if state is None:
+            self.reset()
+        else:
+            self.state = state[STATE_COLUMNS]
+            self.sketch = state[SKETCH_COLUMNS].to_numpy(dtype='float64')
+
+    @property
+    def empty(self):
+        return len(self.state.index) == 0
+
+    def reset(self):
+        self.state = pd.DataFrame(columns=STATE_COLUMNS).astype({
+            'count': 'int64', 'total': 'float64', 'ewma': 'float64',
+            'last_fix_hm_record': 'float64', 'last_service_at': 'datetime64[ns]'
+        })
+        self.sketch = np.full((0, WINDOW), np.nan)
+
+    def update(self, events):
+        # --Fold in the services of `events` (service_events rows) that are newer than the state
+        if events.empty:
+            return
+        events = events.dropna(subset=['interval'])
+        events = events.assign(due_date=pd.to_datetime(events['due_date']).astype('datetime64[ns]'))
+
+        # --Position of every event's (asset, product) in the state, new products get a new state row
+        keys = self.state[SERVICE_KEYS].reset_index().rename(columns={'index': 'position'})
+        events = events.merge(keys, on=SERVICE_KEYS, how='left')
+        unseen = events['position'].isna().to_numpy()
+        if unseen.any():
+            new_products = events.loc[unseen, SERVICE_KEYS + ['product_name']].drop_duplicates(SERVICE_KEYS)
+            new_state = new_products.assign(count=0, total=0.0, ewma=np.nan, last_fix_hm_record=np.nan, last_service_at=pd.NaT)
+            first_position = len(self.state.index)
+            self.state = pd.concat([self.state, new_state], ignore_index=True)
+            self.sketch = np.vstack([self.sketch, np.full((len(new_state.index), WINDOW), np.nan)])
+            new_positions = new_products[SERVICE_KEYS].assign(new_position=np.arange(first_position, len(self.state.index)))
+            events = events.merge(new_positions, on=SERVICE_KEYS, how='left')
+            events['position'] = events['position'].fillna(events['new_position'])
+        position = events['position'].to_numpy(dtype='int64')
+
+        # --Only services after the last one folded in
+        last_service_at = self.state['last_service_at'].to_numpy(dtype='datetime64[ns]')[position]
+        new = np.isnat(last_service_at) | (events['due_date'].to_numpy() > last_service_at)
+        events, position = events[new], position[new]
+        if events.empty:
+            return
+        order = np.lexsort((events['due_date'].to_numpy().view('int64'), position))
+        position = position[order]
+        interval = events['interval'].to_numpy(dtype='float64')[order]
+
+        first = np.ones(len(position), dtype=bool)
+        first[1:] = position[1:] != position[:-1]
+        starts = np.flatnonzero(first)
+        k = np.diff(np.append(starts, len(position)))
+        step = np.arange(len(position)) - np.repeat(starts, k)
+
+        # --Count and sum are plain sums over the new services, the ring buffer slot of a service is its
+        # --running count modulo WINDOW so later services overwrite the oldest ones
+        n = len(self.state.index)
+        count_before = self.state['count'].to_numpy(dtype='int64')
+        count = count_before + np.bincount(position, minlength=n)
+        total = self.state['total'].to_numpy(dtype='float64') + np.bincount(position, weights=interval, minlength=n)
+        keep = step >= np.repeat(k, k) - WINDOW
+        slot = (count_before[position] + step) % WINDOW
+        self.sketch[position[keep], slot[keep]] = interval[keep]
+
+        # --EWMA over k new values: old * (1 - a)^k + sum of a * (1 - a)^(k - 1 - j) * x_j, the first
+        # --interval ever seeds the average
+        ewma = self.state['ewma'].to_numpy(dtype='float64').copy()
+        seed = np.isnan(ewma[position[starts]])
+        weight = EWMA_ALPHA * (1 - EWMA_ALPHA) ** (np.repeat(k, k) - 1 - step)
+        # --A seeded average gives the first value the weight the old average would have had
+        weight = np.where(np.repeat(seed, k) & (step == 0), (1 - EWMA_ALPHA) ** (np.repeat(k, k) - 1), weight)
+        folded = np.add.reduceat(weight * interval, starts)
+        old = np.where(seed, 0, ewma[position[starts]])
+        ewma[position[starts]] = old * (1 - EWMA_ALPHA) ** k + folded
+
+        last = np.append(starts[1:], len(position)) - 1
+        last_fix = self.state['last_fix_hm_record'].to_numpy(dtype='float64').copy()
+        last_fix[position[last]] = events['fix_hm_record'].to_numpy(dtype='float64')[order][last]
+        last_service_at = self.state['last_service_at'].to_numpy(dtype='datetime64[ns]').copy()
+        last_service_at[position[last]] = events['due_date'].to_numpy()[order][last]
+
+        self.state = self.state.assign(count=count, total=total, ewma=ewma, last_fix_hm_record=last_fix, last_service_at=last_service_at)
+        self.save()
+
+    def save(self):
+        state = pd.concat([self.state.reset_index(drop=True), pd.DataFrame(self.sketch, columns=SKETCH_COLUMNS)], axis=1)
+        write_parquet(state, data_path(self.name, 'state.parquet'))
+
+    def quantile(self, q):
+        # --Quantile of the latest WINDOW intervals of every product
+        quantile = np.full(len(self.sketch), np.nan)
+        known = ~np.isnan(self.sketch).all(axis=1)
+        quantile[known] = np.nanquantile(self.sketch[known], q, axis=1)
+        return quantile
+
+    def intervals(self):
+        # --Service interval of every (asset, product) by each basis, rounded like avg_service
+        intervals = self.state[SERVICE_KEYS + ['product_name', 'count', 'last_fix_hm_record', 'last_service_at']].copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            intervals['mean_service'] = np.round(self.state['total'].to_numpy(dtype='float64') / self.state['count'].to_numpy())
+        intervals['median_service'] = np.round(self.quantile(0.5))
+        intervals['ewma_service'] = np.round(self.state['ewma'].to_numpy(dtype='float64'))
+        return intervals
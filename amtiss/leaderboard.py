@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.aggregates import cost_per_hour, period_aggregate
+
+# Standard windows of the leaderboard, in days before the latest record
+WINDOWS = {
+    'Last month': 30,
+    'Last quarter': 91,
+    'Last year': 365
+}
+
+LEVELS = {
+    'Assets': ['asset_category', 'asset_code'],
+    'Categories': ['asset_category']
+}
+
+# Rows with fewer hours worked in the window are left out of the ranking, a few hours turn any
+# purchase into an extreme cost per hour
+MIN_WORK_HOURS = 10
+
+
+def window_totals(daily, days, keys):
+    # --Cost, hours and cost per hour of every key over the last `days` days of the daily aggregate
+    period = pd.to_datetime(daily['period'])
+    recent = daily[(period > period.max() - pd.Timedelta(days=days)).to_numpy()]
+    totals = recent.groupby(keys, as_index=False)[['maintenance_cost', 'work_hours']].sum()
+    totals['cost_per_hour'] = cost_per_hour(totals['maintenance_cost'].to_numpy(), totals['work_hours'].to_numpy())
+    return totals[totals['work_hours'] >= MIN_WORK_HOURS].reset_index(drop=True)
+
+
+def fleet_leaderboards(df):
+    # --Totals of every standard window and level, from one daily aggregate of the whole fleet
+    daily = period_aggregate(df, 'date_only')
+    return {
+        (window, level): window_totals(daily, days, keys)
+        for window, days in WINDOWS.items()
+        for level, keys in LEVELS.items()
+    }
+
+
+def top_n(board, n, column='cost_per_hour', highest=True):
+    # --The n highest (or lowest) rows by partial selection, only those n are sorted
+    values = board[column].to_numpy(dtype='float64')
+    values = -values if highest else values
+    values = np.where(np.isnan(values), np.inf, values)
+    n = min(n, len(values))
+    if n == 0:
+        return board.iloc[[]]
+    picked = np.argpartition(values, n - 1)[:n]
+    picked = picked[np.argsort(values[picked], kind='stable')]
+    return board.iloc[picked].reset_index(drop=True)
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.resets import corrected_hours
+
+# Points kept per asset curve, whatever the length of its history
+MAX_POINTS = 200
+
+
+def downsample(curves, keys, max_points=MAX_POINTS):
+    # --At most max_points rows per curve: rows are bucketed by position along the curve and the last
+    # --row of every bucket is kept, so the cumulative values still end on the latest point
+    position = curves.groupby(keys, sort=False, dropna=False).cumcount().to_numpy()
+    length = curves.groupby(keys, sort=False, dropna=False)[keys[0]].transform('size').to_numpy()
+    bucket = position * max_points // length
+    last = np.ones(len(curves.index), dtype=bool)
+    last[:-1] = (bucket[:-1] != bucket[1:]) | (position[1:] == 0)
+    return curves[last].reset_index(drop=True)
+
+
+def lifecycle_curves(df, max_points=MAX_POINTS):
+    # --Cumulative maintenance cost against cumulative hours worked over the life of every asset,
+    # --one row per day with activity, downsampled per asset
+    keys = ['asset_category', 'asset_code']
+    day = df['date'].dt.normalize()
+    good_consume_rows = df['source'] == 'good_consume'
+    hour_meter_rows = df['source'] == 'hm_record'
+
+    cost = df.loc[good_consume_rows, keys + ['total_price']].assign(day=day[good_consume_rows])
+    cost = cost.groupby(keys + ['day'], dropna=False)['total_price'].sum().rename('cost')
+    hours = df.loc[hour_meter_rows, keys].assign(day=day[hour_meter_rows], hours=corrected_hours(df[hour_meter_rows]))
+    hours = hours.groupby(keys + ['day'], dropna=False)['hours'].sum()
+
+    curves = pd.concat([cost, hours], axis=1).fillna(0).reset_index().sort_values(keys + ['day'], ignore_index=True)
+    curves['cumulative_cost'] = curves.groupby(keys, dropna=False)['cost'].cumsum()
+    curves['cumulative_hours'] = curves.groupby(keys, dropna=False)['hours'].cumsum()
+    curves = curves[keys + ['day', 'cumulative_cost', 'cumulative_hours']]
+    return downsample(curves, keys, max_points)
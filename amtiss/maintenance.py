@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+# Group key of one product on one asset in the maintenance pipeline
+SERVICE_KEYS = ['asset_category', 'asset_code', 'asset_name', 'product_id']
+
+
+def join_service_day(merged_df, hm_data):
+    # --Hour meter readings taken on the same day a product was serviced, as an equi-join on
+    # --(asset_category, asset_code, day) so only matching pairs are ever materialized
+    left = merged_df.assign(
+        due_date=pd.to_datetime(merged_df['due_date'], errors='coerce').dt.normalize().astype('datetime64[ns]')
+    ).dropna(subset=['due_date'])
+    right = hm_data.assign(
+        asset_used_at=pd.to_datetime(hm_data['asset_used_at'], errors='coerce').dt.normalize().astype('datetime64[ns]')
+    ).dropna(subset=['asset_used_at'])
+    return pd.merge(
+        left, right,
+        left_on=['asset_category', 'asset_code', 'due_date'],
+        right_on=['asset_category', 'asset_code', 'asset_used_at'],
+        how='inner'
+    )
+
+
+def service_group_codes(merged_df):
+    # --Factorize the product key once, rows with a missing key part get -1 like groupby's dropna
+    return merged_df.groupby(SERVICE_KEYS, sort=False).ngroup().to_numpy()
+
+
+def _sorted_intervals(merged_df, filtered_df):
+    # --filtered_df rows sorted by (service group, service day) with the interval since the previous
+    # --service of the group; the first service falls back to fix_hm_record minus the group minimum
+    # --of merged_df, taken before the service day join like before
+    all_codes = merged_df['service_group'].to_numpy()
+    all_fix = merged_df['fix_hm_record'].to_numpy(dtype='float64')
+    n_groups = int(all_codes.max()) + 1 if len(all_codes) else 0
+
+    group_min = np.full(n_groups, np.nan)
+    known = (all_codes >= 0) & ~np.isnan(all_fix)
+    np.fmin.at(group_min, all_codes[known], all_fix[known])
+
+    rows = filtered_df[filtered_df['service_group'] >= 0]
+    codes = rows['service_group'].to_numpy()
+    days = rows['due_date'].to_numpy(dtype='datetime64[ns]').view('int64')
+    order = np.lexsort((days, codes))
+    codes = codes[order]
+    fix = rows['fix_hm_record'].to_numpy(dtype='float64')[order]
+
+    # --Segment boundaries of the sorted groups
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(first)
+
+    interval = np.empty(len(fix))
+    interval[1:] = fix[1:] - fix[:-1]
+    interval[first] = np.nan
+    interval = np.where(np.isnan(interval), fix - group_min[codes], interval)
+    return rows, order, codes, starts, fix, interval
+
+
+def service_intervals(merged_df, filtered_df):
+    # --Every service with its interval, in service order within each (asset, product)
+    rows, order, codes, starts, fix, interval = _sorted_intervals(merged_df, filtered_df)
+    intervals = rows.iloc[order][SERVICE_KEYS + ['product_name', 'due_date']].reset_index(drop=True)
+    intervals['fix_hm_record'] = fix
+    intervals['interval'] = interval
+    return intervals
+
+
+def service_interval_stats(merged_df, filtered_df):
+    # --Interval diffs, first interval fallback, average interval and service count in one sorted pass
+    # --over contiguous group segments; both frames carry the 'service_group' code of service_group_codes
+    rows, order, codes, starts, fix, interval = _sorted_intervals(merged_df, filtered_df)
+    counts = np.diff(np.append(starts, len(codes)))
+
+    known = ~np.isnan(interval)
+    if len(starts):
+        interval_sum = np.add.reduceat(np.where(known, interval, 0), starts)
+        interval_count = np.add.reduceat(known.astype('int64'), starts)
+    else:
+        interval_sum = interval_count = np.array([], dtype='int64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_service = np.round(interval_sum / interval_count)
+
+    # --Compact per (asset, product) table
+    segment_rows = rows.iloc[order[starts]]
+    service_groups = segment_rows[SERVICE_KEYS].reset_index(drop=True)
+    service_groups['service_group'] = codes[starts]
+    service_groups['avg_service'] = avg_service
+    service_groups['service_count'] = counts
+
+    # --One row per service event (consume id) of every group, statistics gathered by position
+    segment = np.repeat(np.arange(len(starts)), counts)
+    consume_codes, consume_ids = pd.factorize(rows['consume_id_good_consume'].to_numpy()[order])
+    _, event_rows = np.unique(segment * (len(consume_ids) + 1) + consume_codes + 1, return_index=True)
+    events = rows.iloc[order[event_rows]]
+    df_new = pd.DataFrame({
+        'asset_category': events['asset_category'].to_numpy(),
+        'asset_code': events['asset_code'].to_numpy(),
+        'asset_name': events['asset_name'].to_numpy(),
+        'product_id': events['product_id'].to_numpy(),
+        'product_name': events['product_name'].to_numpy(),
+        'service_count': counts[segment[event_rows]],
+        'consume_id_good_consume': events['consume_id_good_consume'].to_numpy(),
+        'avg_service': avg_service[segment[event_rows]]
+    })
+    return service_groups, df_new
+
+
+def classify_status(df, service_interval):
+    # --Status of every product from the hours since its last service and its service interval
+    conditions = [
+        (df['hours_after_maintained'] > service_interval),
+        (df['hours_after_maintained'] >= service_interval - 24) & (df['hours_after_maintained'] <= service_interval),
+        (df['hours_after_maintained'] < service_interval),
+        (df['product_name'].isna() & df['latest_asset_used_at'].notna())
+    ]
+    choices = ['Needed service', 'Incoming Service', 'Good condition', 'Product not registered in good consume record']
+    return np.select(conditions, choices, default=None)
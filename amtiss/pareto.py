@@ -0,0 +1,54 @@
+import numpy as np
+
+# Share of the spend the "vital few" products make up
+PARETO_SHARE = 0.8
+
+LEVELS = {
+    'Assets': ['asset_category', 'asset_code'],
+    'Categories': ['asset_category']
+}
+
+
+def cumulative_shares(spend, keys):
+    # --Products of every key ranked by spend, with their share and the running share of the key's
+    # --total; the rows up to and including the one crossing PARETO_SHARE are marked as vital
+    spend = spend.sort_values(keys + ['total_price', 'product_name'], ascending=[True] * len(keys) + [False, True], ignore_index=True)
+    total = spend.groupby(keys, sort=False, dropna=False)['total_price'].transform('sum').to_numpy()
+    cumulative = spend.groupby(keys, sort=False, dropna=False)['total_price'].cumsum().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        spend['share'] = np.where(total > 0, spend['total_price'].to_numpy() / total, np.nan)
+        spend['cumulative_share'] = np.where(total > 0, cumulative / total, np.nan)
+    spend['rank'] = spend.groupby(keys, sort=False, dropna=False).cumcount() + 1
+    spend['vital'] = (spend['cumulative_share'] - spend['share']) < PARETO_SHARE
+    return spend
+
+
+def product_spend(df):
+    # --Spend and purchase count of every product per asset and per category, from one pass over the
+    # --good_consume rows
+    good_consume_rows = df[df['source'] == 'good_consume']
+    by_asset = good_consume_rows.groupby(LEVELS['Assets'] + ['product_name'], dropna=False, observed=True).agg(
+        total_price=('total_price', 'sum'),
+        purchases=('total_price', 'size')
+    ).reset_index()
+    by_category = by_asset.groupby(LEVELS['Categories'] + ['product_name'], dropna=False).agg(
+        total_price=('total_price', 'sum'),
+        purchases=('purchases', 'sum')
+    ).reset_index()
+    return {
+        'Assets': cumulative_shares(by_asset, LEVELS['Assets']),
+        'Categories': cumulative_shares(by_category, LEVELS['Categories'])
+    }
+
+
+def pareto(spend, level, selected):
+    # --Pareto table of the selected keys (asset codes or categories): a single key is read from the
+    # --precomputed shares, several keys are combined from the small per product table
+    key = LEVELS[level][-1]
+    table = spend[level]
+    table = table[table[key].isin(selected)]
+    if table[key].nunique() <= 1:
+        return table[['product_name', 'total_price', 'purchases', 'share', 'cumulative_share', 'rank', 'vital']].reset_index(drop=True)
+    combined = table.groupby('product_name', dropna=False)[['total_price', 'purchases']].sum().reset_index()
+    combined = cumulative_shares(combined.assign(selection=0), ['selection'])
+    return combined.drop(columns='selection')
@@ -0,0 +1,124 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from amtiss.storage import data_path, read_json, read_parquet, write_json, write_parquet
+
+# Brand names left out of the product names before clustering, they say nothing about the part
+BRAND_NAMES = [
+    'toyota', 'mitsubishi', 'hino', 'dongfeng', 'mazda', 'ford', 'hilux',
+    'suzuki', 'triton', 'strada', 'dutro', 'bridgestone', 'innova', 'avanza',
+    'luxio', 'liugong', 'yukimura', 'weichai'
+]
+
+N_CLUSTERS = 1000
+
+# Centroid weights below this are not stored, they cannot change which cluster is the nearest
+MIN_CENTROID_WEIGHT = 1e-6
+
+
+def clean_product_names(product_names):
+    # --Lower case product names without words containing digits, brand names and special characters,
+    # --cut to their first two words
+    names = pd.Series(product_names, dtype='object').fillna('').astype(str)
+    names = names.str.replace(r'\b\w*\d\w*\b', '', regex=True)
+    names = names.str.replace(r'\b(?:' + '|'.join(BRAND_NAMES) + r')\b', '', regex=True, case=False)
+    names = names.str.replace(r'[^a-zA-Z\s]', '', regex=True)
+    return names.str.lower().str.split().str[:2].str.join(' ')
+
+
+class ProductClusters:
+    # Product subcategories, TF-IDF + mini-batch k-means over the cleaned product names
+    # --the model is trained offline (python -m amtiss.product_clusters <product names file>) and
+    # --persisted as its vocabulary, sparse centroids and cluster labels; the dashboards only assign,
+    # --which is a few joins over the distinct product names and needs no scikit-learn
+
+    def __init__(self, name='product_clusters'):
+        self.name = name
+        self.manifest = read_json(data_path(name, 'manifest.json'), default={'version': 0})
+        self.version = self.manifest['version']
+        self.vocabulary = read_parquet(data_path(name, 'vocabulary.parquet'))
+        self.centroids = read_parquet(data_path(name, 'centroids.parquet'))
+        self.labels = read_parquet(data_path(name, 'labels.parquet'))
+
+    @property
+    def trained(self):
+        return self.vocabulary is not None and self.centroids is not None and self.labels is not None
+
+    def fit(self, product_names, n_clusters=N_CLUSTERS):
+        # --Offline job: cluster the distinct multi word names, single word names are their own
+        # --subcategory and are never clustered
+        from sklearn.cluster import MiniBatchKMeans
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        cleaned = clean_product_names(pd.Series(product_names).dropna().unique()).drop_duplicates()
+        multi_word = cleaned[cleaned.str.contains(' ', regex=False)].to_numpy()
+
+        vectorizer = TfidfVectorizer(tokenizer=str.split, token_pattern=None, lowercase=False)
+        X = vectorizer.fit_transform(multi_word)
+        kmeans = MiniBatchKMeans(n_clusters=min(n_clusters, len(multi_word)), batch_size=2048, n_init=3, random_state=0)
+        kmeans.fit(X)
+
+        terms = vectorizer.get_feature_names_out()
+        centers = kmeans.cluster_centers_
+        cluster, term = np.nonzero(centers >= MIN_CENTROID_WEIGHT)
+
+        # Determine cluster labels based on the top 2 most common terms
+        order_centroids = centers.argsort()[:, ::-1]
+        cluster_labels = [' '.join(sorted(set(terms[ind] for ind in order_centroids[i, :2]))[::-1]) for i in range(len(centers))]
+
+        self.vocabulary = pd.DataFrame({'term': terms, 'idf': vectorizer.idf_})
+        self.centroids = pd.DataFrame({'cluster': cluster, 'term': terms[term], 'weight': centers[cluster, term]})
+        self.labels = pd.DataFrame({
+            'cluster': np.arange(len(centers)),
+            'label': cluster_labels,
+            'half_norm': 0.5 * (centers ** 2).sum(axis=1)
+        })
+        self.save(len(multi_word))
+        return self
+
+    def save(self, product_names):
+        self.version += 1
+        write_parquet(self.vocabulary, data_path(self.name, 'vocabulary.parquet'))
+        write_parquet(self.centroids, data_path(self.name, 'centroids.parquet'))
+        write_parquet(self.labels, data_path(self.name, 'labels.parquet'))
+        self.manifest = {'version': self.version, 'product_names': product_names, 'clusters': len(self.labels.index), 'terms': len(self.vocabulary.index)}
+        write_json(self.manifest, data_path(self.name, 'manifest.json'))
+
+    def assign(self, product_names):
+        # --Subcategory of every distinct product name, indexed by product name: the nearest centroid
+        # --of its TF-IDF vector, or the cleaned name itself for single word names and names sharing
+        # --no word with the vocabulary
+        names = pd.Series(pd.Series(product_names).dropna().unique(), dtype='object')
+        cleaned = clean_product_names(names)
+        subcategory = cleaned.copy()
+
+        # --TF-IDF vectors as (name, term, weight) rows, l2 normalized like the vectorizer does
+        multi_word = cleaned.str.contains(' ', regex=False)
+        tokens = cleaned[multi_word].str.split().explode().rename('term').reset_index()
+        tokens = tokens.groupby(['index', 'term']).size().rename('count').reset_index().merge(self.vocabulary, on='term')
+        tokens['weight'] = tokens['count'] * tokens['idf']
+        tokens['weight'] /= np.sqrt((tokens['weight'] ** 2).groupby(tokens['index']).transform('sum'))
+
+        # --Nearest centroid: the largest x.c - |c|^2 / 2, only clusters sharing a term with the name
+        scores = tokens[['index', 'term', 'weight']].merge(self.centroids, on='term', suffixes=('', '_centroid'))
+        scores['dot'] = scores['weight'] * scores['weight_centroid']
+        scores = scores.groupby(['index', 'cluster'])['dot'].sum().reset_index().merge(self.labels, on='cluster')
+        scores['score'] = scores['dot'] - scores['half_norm']
+        nearest = scores.sort_values('score', ascending=False, kind='stable').drop_duplicates('index').set_index('index')
+        # --A cluster sharing no term scores -|c|^2 / 2, the smallest centroid may still be nearer
+        smallest = self.labels.loc[self.labels['half_norm'].idxmin()]
+        nearest.loc[nearest['score'] < -smallest['half_norm'], 'label'] = smallest['label']
+        subcategory[nearest.index] = nearest['label']
+
+        subcategory = subcategory.where(subcategory != '', 'uncategorized').str.upper()
+        return pd.Series(subcategory.to_numpy(), index=names.to_numpy(), name='product_subcategory')
+
+
+if __name__ == '__main__':
+    # --e.g. python -m amtiss.product_clusters product_names.csv, any csv / parquet with a product_name column
+    path = sys.argv[1]
+    product_names = pd.read_parquet(path, columns=['product_name']) if path.endswith('.parquet') else pd.read_csv(path, usecols=['product_name'])
+    clusters = ProductClusters().fit(product_names['product_name'])
+    print(clusters.manifest)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+# Trailing window the utilization of an asset is measured over, in days before its latest reading
+UTILIZATION_DAYS = 30
+
+# Columns the projection adds to the status table
+PROJECTION_COLUMNS = ['projected_due_date', 'due_in_days']
+
+
+def utilization_rates(hm_data, window_days=UTILIZATION_DAYS):
+    # --Hours per day of every asset over its trailing window, from the daily hm_data readings;
+    # --only increases of the hour meter count, so a meter reset does not turn into negative usage
+    readings = hm_data.dropna(subset=['hour_meter']).assign(
+        asset_used_at=pd.to_datetime(hm_data['asset_used_at'], errors='coerce')
+    ).dropna(subset=['asset_used_at']).sort_values(['asset_category', 'asset_code', 'asset_used_at'])
+    keys = ['asset_category', 'asset_code']
+    latest = readings.groupby(keys)['asset_used_at'].transform('max')
+    readings = readings[readings['asset_used_at'] >= latest - pd.Timedelta(days=window_days)]
+
+    increase = readings.groupby(keys)['hour_meter'].diff().clip(lower=0)
+    rates = readings.assign(increase=increase).groupby(keys).agg(
+        hours=('increase', 'sum'),
+        first_day=('asset_used_at', 'min'),
+        last_day=('asset_used_at', 'max')
+    )
+    days = (rates['last_day'] - rates['first_day']).dt.days
+    rates['hours_per_day'] = (rates['hours'] / days).where(days > 0)
+    return rates['hours_per_day'].reset_index()
+
+
+def project_due_dates(table, today=None):
+    # --Calendar date every product reaches its service interval at the asset's current utilization,
+    # --counted from the latest hour meter reading; an overdue product gets the date it became due
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    rate = table['hours_per_day'].to_numpy(dtype='float64')
+    remaining = (table['avg_service'] - table['hours_after_maintained']).to_numpy(dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days = np.where(rate > 0, remaining / rate, np.nan)
+    projected = pd.to_datetime(table['latest_asset_used_at'], errors='coerce') + pd.to_timedelta(days, unit='D')
+    projected = projected.dt.normalize()
+    return pd.DataFrame({
+        'projected_due_date': projected,
+        'due_in_days': (projected - today).dt.days
+    }, index=table.index)
+
+
+def weekly_workload(table, weeks=12, today=None):
+    # --Number of products coming due per week and category over the next weeks, products already
+    # --overdue are counted in the current week
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    week_start = today - pd.Timedelta(days=today.weekday())
+    due = table.dropna(subset=['projected_due_date'])
+    due = due[due['projected_due_date'] < week_start + pd.Timedelta(weeks=weeks)]
+    week = due['projected_due_date'].where(due['projected_due_date'] >= week_start, week_start)
+    week = week - pd.to_timedelta(week.dt.weekday, unit='D')
+    workload = due.assign(week=week, overdue=due['due_in_days'] < 0).groupby(['week', 'asset_category']).agg(
+        products=('asset_code', 'size'),
+        overdue=('overdue', 'sum')
+    ).reset_index()
+    return workload
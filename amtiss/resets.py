@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+RESET_KEYS = ['asset_category', 'asset_code']
+
+RESET_COLUMNS = RESET_KEYS + ['date', 'pre_reset_reading', 'post_reset_reading']
+
+
+def detect_resets(hour_meter_rows):
+    # --Rows where the hour meter of the asset was reset: flagged with reset_hm by the user, or the
+    # --hours of the day are negative because the meter went back
+    hours = hour_meter_rows['hour_meter_per_date'].to_numpy(dtype='float64')
+    flagged = (hour_meter_rows['reset_hm'].astype(str).str.lower() == 'true').to_numpy()
+    return flagged | (hours < 0)
+
+
+def corrected_hours(hour_meter_rows):
+    # --Hours worked per row, a reset row carries the drop of the meter instead of the hours worked,
+    # --so it adds nothing
+    hours = hour_meter_rows['hour_meter_per_date'].to_numpy(dtype='float64')
+    return np.where(detect_resets(hour_meter_rows), 0, np.fmax(np.nan_to_num(hours), 0))
+
+
+def corrected_series(df):
+    # --Hour meter rows of every asset in date order with the hours worked and the reconstructed hour
+    # --meter, the running sum of the hours worked, which never goes back at a reset
+    hour_meter_rows = df[df['source'] == 'hm_record'].sort_values(RESET_KEYS + ['date'], kind='stable')
+    series = hour_meter_rows[RESET_KEYS + ['date', 'hour_meter_per_date']].assign(
+        reset=detect_resets(hour_meter_rows),
+        corrected_hours=corrected_hours(hour_meter_rows)
+    )
+    series['corrected_hour_meter'] = series.groupby(RESET_KEYS, sort=False, dropna=False)['corrected_hours'].cumsum()
+    return series.reset_index(drop=True)
+
+
+def reset_events(series):
+    # --One row per reset: the reconstructed reading the meter had before the reset and the value
+    # --recorded on the reset day
+    events = series[series['reset'].to_numpy()]
+    return pd.DataFrame({
+        'asset_category': events['asset_category'].to_numpy(),
+        'asset_code': events['asset_code'].to_numpy(),
+        'date': events['date'].to_numpy(),
+        'pre_reset_reading': events['corrected_hour_meter'].to_numpy(),
+        'post_reset_reading': events['hour_meter_per_date'].to_numpy()
+    }, columns=RESET_COLUMNS)
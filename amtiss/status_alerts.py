@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pandas as pd
+
+from amtiss.storage import append_jsonl, data_path, read_jsonl
+
+# Identity of a row of the status table, rows sharing it are told apart by their order of appearance
+ROW_KEYS = ['partition', 'asset_category', 'asset_code', 'asset_name', 'product_name']
+
+# Statuses worth alerting on
+ALERT_STATUSES = ['Needed service', 'Incoming Service']
+
+COUNTER_KEYS = ['asset_category', 'asset_code', 'asset_name']
+
+
+def status_transitions(previous, current):
+    # --Rows whose status differs between two versions of the same assets, a row that appeared has no
+    # --status_before and one that disappeared has no status_after
+    def keyed(df):
+        keyed_df = df[ROW_KEYS + ['status', 'avg_service', 'hours_after_maintained']].copy()
+        keyed_df['occurrence'] = keyed_df.groupby(ROW_KEYS, dropna=False).cumcount()
+        return keyed_df
+
+    merged = keyed(previous).merge(keyed(current), on=ROW_KEYS + ['occurrence'], how='outer', suffixes=('_before', '_after'))
+    changed = merged['status_before'].fillna('').ne(merged['status_after'].fillna(''))
+    transitions = merged[changed.to_numpy()].rename(columns={
+        'avg_service_after': 'avg_service',
+        'hours_after_maintained_after': 'hours_after_maintained'
+    })
+    return transitions[ROW_KEYS[1:] + ['status_before', 'status_after', 'avg_service', 'hours_after_maintained']].reset_index(drop=True)
+
+
+class AlertFeed:
+    # Append only feed of status transitions, written on every refresh of a StatusStore
+    # --only the assets the refresh recomputed are diffed, the first build of a store emits nothing
+
+    def __init__(self, store, name='alerts.jsonl'):
+        self.path = data_path(store.name, name)
+        store.listeners.append(self)
+
+    def update(self, previous, current, version):
+        if previous is None:
+            return
+        transitions = status_transitions(previous, current)
+        transitions = transitions.astype(object).where(transitions.notna(), None)
+        transitions.insert(0, 'detected_at', datetime.now().isoformat(timespec='seconds'))
+        transitions.insert(1, 'version', version)
+        append_jsonl(transitions.to_dict('records'), self.path)
+
+    def recent(self, limit=100):
+        # --Latest transitions, newest first
+        return pd.DataFrame(read_jsonl(self.path, limit=limit)[::-1])
+
+
+class StatusCounter:
+    # Number of products per asset in one status, kept up to date from the rows of changed assets
+    # --so the counts never need a regroup of the whole status table
+
+    def __init__(self, store, status='Needed service'):
+        self.status = status
+        self.counts = None if store.table is None else self._count(store.table)
+        store.listeners.append(self)
+
+    def _count(self, rows):
+        rows = rows[rows['status'] == self.status]
+        return rows.groupby(COUNTER_KEYS, dropna=False).size()
+
+    def update(self, previous, current, version):
+        counts = self._count(current)
+        if previous is not None:
+            counts = counts.add(self.counts.sub(self._count(previous), fill_value=0), fill_value=0)
+        self.counts = counts[counts > 0].astype('int64')
+
+    def top(self, n=10, categories=None, asset_codes=None):
+        if self.counts is None:
+            return pd.DataFrame(columns=COUNTER_KEYS + ['count'])
+        counts = self.counts.reset_index(name='count')
+        if categories:
+            counts = counts[counts['asset_category'].isin(categories)]
+        if asset_codes:
+            counts = counts[counts['asset_code'].isin(asset_codes)]
+        return counts.nlargest(n, 'count')
@@ -0,0 +1,131 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from amtiss.storage import data_path, read_json, read_parquet, write_json, write_parquet
+
+# Identity of a product row across days, rows sharing it are told apart by their order of appearance
+HISTORY_KEYS = ['asset_category', 'asset_code', 'asset_name', 'product_name']
+
+# Status code of a row that is no longer in the table
+GONE = -1
+
+# A status counted as overdue
+OVERDUE_STATUS = 'Needed service'
+
+
+class StatusHistory:
+    # Daily snapshots of the status table, kept small by encoding
+    # --dictionary: every product row is stored once in rows.parquet and referred to by an integer row_id,
+    # --statuses are int8 codes into the list kept in the manifest
+    # --delta: changes_YYYY-MM.parquet holds the full state on the first recorded day of the month, then
+    # --only the rows whose status changed from the previous recorded day
+    # --a day that was never recorded keeps the state of the last recorded day before it
+
+    def __init__(self, name='status_history'):
+        self.name = name
+        self.manifest = read_json(data_path(name, 'manifest.json'), default={'statuses': [], 'last_day': None, 'last_version': None})
+        rows = read_parquet(data_path(name, 'rows.parquet'))
+        if rows is None:
+            rows = pd.DataFrame(columns=['row_id'] + HISTORY_KEYS + ['occurrence']).astype({'row_id': 'int32', 'occurrence': 'int32'})
+        self.rows = rows
+
+    def _month_path(self, month):
+        return data_path(self.name, f'changes_{month}.parquet')
+
+    def _row_ids(self, table):
+        # --Row id of every row of the table, unseen rows get new ids appended to the dictionary
+        keyed = table[HISTORY_KEYS].copy()
+        keyed['occurrence'] = keyed.groupby(HISTORY_KEYS, dropna=False).cumcount()
+        matched = keyed.merge(self.rows, on=HISTORY_KEYS + ['occurrence'], how='left')
+        unseen = matched['row_id'].isna().to_numpy()
+        if unseen.any():
+            first_id = len(self.rows.index)
+            new_rows = keyed[unseen].copy()
+            new_rows.insert(0, 'row_id', np.arange(first_id, first_id + unseen.sum()))
+            self.rows = pd.concat([self.rows, new_rows], ignore_index=True).astype({'row_id': 'int32', 'occurrence': 'int32'})
+            write_parquet(self.rows, data_path(self.name, 'rows.parquet'))
+            matched.loc[unseen, 'row_id'] = new_rows['row_id'].to_numpy()
+        return matched['row_id'].to_numpy(dtype='int32')
+
+    def _status_codes(self, status):
+        status = status.fillna('(none)')
+        for value in status.unique():
+            if value not in self.manifest['statuses']:
+                self.manifest['statuses'].append(value)
+        return pd.Categorical(status, categories=self.manifest['statuses']).codes.astype('int8')
+
+    def record(self, table, version, day=None):
+        # --Store the state of `table` for `day` (today by default), recording the same day again
+        # --replaces it so the last refresh of a day wins
+        day = pd.Timestamp(day or date.today()).normalize()
+        if self.manifest['last_day'] == str(day.date()) and self.manifest['last_version'] == version:
+            return
+        month = day.strftime('%Y-%m')
+        current = pd.DataFrame({'row_id': self._row_ids(table), 'status': self._status_codes(table['status'])})
+
+        changes = read_parquet(self._month_path(month))
+        if changes is None:
+            changes = pd.DataFrame({'day': pd.Series(dtype='datetime64[ns]'), 'row_id': pd.Series(dtype='int32'), 'status': pd.Series(dtype='int8')})
+        changes = changes[changes['day'] < day]
+        if changes.empty:
+            # --First recorded day of the month, a full keyframe
+            delta = current
+        else:
+            previous = changes.drop_duplicates('row_id', keep='last')
+            previous = previous[previous['status'] != GONE]
+            merged = previous[['row_id', 'status']].merge(current, on='row_id', how='outer', suffixes=('_before', '_after'))
+            merged['status_after'] = merged['status_after'].fillna(GONE)
+            delta = merged.loc[merged['status_before'].ne(merged['status_after']).to_numpy(), ['row_id', 'status_after']]
+            delta = delta.rename(columns={'status_after': 'status'})
+        delta = delta.astype({'row_id': 'int32', 'status': 'int8'})
+        delta.insert(0, 'day', day)
+        write_parquet(pd.concat([changes, delta], ignore_index=True), self._month_path(month))
+
+        self.manifest.update({'last_day': str(day.date()), 'last_version': version})
+        write_json(self.manifest, data_path(self.name, 'manifest.json'))
+
+    def status_counts(self, start, end, by='asset_category', statuses=None):
+        # --Number of rows in every status per day and `by` group, as day, by, status, count
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        frames = []
+        for month in pd.period_range(start, end, freq='M'):
+            changes = read_parquet(self._month_path(str(month)))
+            if changes is not None and not changes.empty:
+                frames.append(self._replay_counts(changes, by, month))
+        if not frames:
+            return pd.DataFrame(columns=['day', by, 'status', 'count'])
+
+        counts = pd.concat(frames, ignore_index=True)
+        counts = counts[(counts['day'] >= start) & (counts['day'] <= end)]
+        counts['status'] = np.asarray(self.manifest['statuses'], dtype=object)[counts['status'].to_numpy()]
+        if statuses is not None:
+            counts = counts[counts['status'].isin(statuses)]
+        return counts.reset_index(drop=True)
+
+    def _replay_counts(self, changes, by, month):
+        # --Every change adds one to its new status and removes one from the status it replaces,
+        # --a cumulative sum over the days of the month then gives the daily counts
+        changes = changes.sort_values(['row_id', 'day'], kind='stable')
+        before = changes.groupby('row_id')['status'].shift().fillna(GONE).astype('int8')
+        group = self.rows.set_index('row_id')[by].reindex(changes['row_id'].to_numpy()).to_numpy()
+        events = pd.concat([
+            pd.DataFrame({'day': changes['day'].to_numpy(), by: group, 'status': changes['status'].to_numpy(), 'delta': 1}),
+            pd.DataFrame({'day': changes['day'].to_numpy(), by: group, 'status': before.to_numpy(), 'delta': -1})
+        ])
+        events = events[events['status'] != GONE]
+
+        daily = events.pivot_table(index='day', columns=[by, 'status'], values='delta', aggfunc='sum', fill_value=0)
+        last_day = min(month.end_time.normalize(), pd.Timestamp(date.today()))
+        days = pd.date_range(daily.index.min(), max(last_day, daily.index.max()), freq='D')
+        daily = daily.reindex(days, fill_value=0).cumsum()
+        daily.index.name = 'day'
+        counts = daily.melt(ignore_index=False, value_name='count').reset_index()
+        return counts[counts['count'] > 0]
+
+
+def overdue_over_time(history, start, end, by='asset_category'):
+    # --Daily number of products in 'Needed service', per `by` group
+    counts = history.status_counts(start, end, by=by, statuses=[OVERDUE_STATUS])
+    return counts[['day', by, 'count']]
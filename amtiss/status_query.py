@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.intervals import INTERVAL_BASES
+from amtiss.maintenance import SERVICE_KEYS, classify_status
+from amtiss.projection import PROJECTION_COLUMNS, project_due_dates
+from amtiss.status_table import SNAPSHOT_COLUMNS, STATUS_COLUMNS, StatusStore
+
+# Columns of a query result, the status table with the product subcategory and the projected due date
+QUERY_COLUMNS = STATUS_COLUMNS[:3] + ['product_subcategory'] + STATUS_COLUMNS[3:] + PROJECTION_COLUMNS
+
+# Sort orders of the status table, the label is what the dashboard shows
+SORT_KEYS = {
+    'Most overdue first': ('overdue_margin', False),
+    'Least overdue first': ('overdue_margin', True),
+    'Hours after maintained': ('hours_after_maintained', False),
+    'Service count': ('service_count', False),
+    'Due soonest': ('due_in_days', True),
+    'Latest asset usage': ('latest_asset_used_at', False),
+    'Asset code': ('asset_code', True)
+}
+
+
+def service_interval(table, intervals, column):
+    # --Interval of every row by the chosen basis, rows the estimator has no intervals for keep avg_service;
+    # --matched on the estimator's own product key, product names are not unique
+    keys = SERVICE_KEYS
+    chosen = intervals.drop_duplicates(keys)[keys + [column]]
+    matched = table[keys].merge(chosen, on=keys, how='left')[column].to_numpy()
+    return np.where(np.isnan(matched), table['avg_service'].to_numpy(dtype='float64'), matched)
+
+
+class StatusQuery:
+    # Query layer over one snapshot of the maintenance status table
+    # --secondary indexes map every status / category / asset code to the row positions holding it,
+    # --every sort order is precomputed as a rank so a page is a keyset seek instead of a sort
+    # --with another basis than 'Mean', avg_service and status are recomputed from the interval estimator
+    # --product_subcategories maps product names to their subcategory (ProductClusters.assign), the
+    # --column stays empty without it
+
+    def __init__(self, table, intervals=None, basis='Mean', today=None, product_subcategories=None):
+        self.table = table.reindex(columns=SNAPSHOT_COLUMNS).reset_index(drop=True)
+        if product_subcategories is not None:
+            self.table['product_subcategory'] = product_subcategories.reindex(self.table['product_name']).to_numpy()
+        else:
+            self.table['product_subcategory'] = None
+        if basis != 'Mean' and intervals is not None:
+            self.table['avg_service'] = service_interval(self.table, intervals, INTERVAL_BASES[basis])
+            self.table['status'] = classify_status(self.table, self.table['avg_service'])
+        self.table[PROJECTION_COLUMNS] = project_due_dates(self.table, today)
+        # --How far past the average service interval a product is, negative means still within it
+        self.table['overdue_margin'] = self.table['hours_after_maintained'] - self.table['avg_service']
+        self.indexes = {
+            column: self._index(self.table[column])
+            for column in ['status', 'asset_category', 'asset_code', 'product_subcategory']
+        }
+        self.orders = {}
+        self.ranks = {}
+        for column, ascending in set(SORT_KEYS.values()):
+            # --Ties are broken by row position, missing values always go last
+            order = self.table[column].sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+            rank = np.empty(len(order), dtype='int64')
+            rank[order] = np.arange(len(order))
+            self.orders[(column, ascending)] = order
+            self.ranks[(column, ascending)] = rank
+
+    @staticmethod
+    def _index(column):
+        codes, values = pd.factorize(column)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+        return {value: order[bounds[i]:bounds[i + 1]] for i, value in enumerate(values)}
+
+    def select(self, statuses=None, categories=None, asset_codes=None, subcategories=None):
+        # --Row positions matching every given filter, None means no filter on that column
+        selected = np.ones(len(self.table.index), dtype=bool)
+        for column, values in [('status', statuses), ('asset_category', categories), ('asset_code', asset_codes), ('product_subcategory', subcategories)]:
+            if values is None:
+                continue
+            mask = np.zeros(len(self.table.index), dtype=bool)
+            for value in values:
+                mask[self.indexes[column].get(value, [])] = True
+            selected &= mask
+        return np.flatnonzero(selected)
+
+    def count(self, statuses=None, categories=None, asset_codes=None, subcategories=None):
+        return len(self.select(statuses, categories, asset_codes, subcategories))
+
+    def page(self, statuses=None, categories=None, asset_codes=None, subcategories=None, sort='Most overdue first', after=None, limit=20):
+        # --One page of rows after the cursor of the previous page, plus the cursor for the next one
+        # --(None when this is the last page); the cursor is the rank of the last row in the sort order
+        selected = self.select(statuses, categories, asset_codes, subcategories)
+        selected_ranks = np.sort(self.ranks[SORT_KEYS[sort]][selected])
+        start = 0 if after is None else np.searchsorted(selected_ranks, after, side='right')
+        page_ranks = selected_ranks[start:start + limit]
+
+        rows = self.table.iloc[self.orders[SORT_KEYS[sort]][page_ranks]][QUERY_COLUMNS].reset_index(drop=True)
+        next_cursor = int(page_ranks[-1]) if start + limit < len(selected_ranks) else None
+        return rows, next_cursor
+
+    def rows(self, statuses=None, categories=None, asset_codes=None, subcategories=None):
+        return self.table.iloc[self.select(statuses, categories, asset_codes, subcategories)][QUERY_COLUMNS]
+
+
+def load_status_query(basis='Mean'):
+    # --Entry point for tools outside Streamlit, reads the latest snapshot without recomputing anything
+    store = StatusStore()
+    if store.table is None:
+        raise FileNotFoundError('No status snapshot yet, open the overview dashboard or run StatusStore().refresh(data) first')
+    return StatusQuery(store.table, store.estimator.intervals(), basis)
+
+
+def needed_service(categories=None, asset_codes=None, basis='Mean'):
+    # --e.g. python -c "from amtiss.status_query import needed_service; print(needed_service())"
+    return load_status_query(basis).rows(statuses=['Needed service'], categories=categories, asset_codes=asset_codes)
@@ -0,0 +1,335 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from amtiss.consume_index import ConsumeIndex
+from amtiss.intervals import IntervalEstimator
+from amtiss.maintenance import classify_status, join_service_day, service_group_codes, service_interval_stats, service_intervals
+from amtiss.projection import utilization_rates
+from amtiss.storage import data_path, read_json, read_parquet, write_json, write_parquet
+
+# Columns of the maintenance status table (df_final)
+STATUS_COLUMNS = [
+    'asset_category', 'asset_code', 'asset_name',
+    'product_name', 'status', 'service_count',
+    'latest_product_maintained_at', 'maintained_hour_meter', 'latest_asset_used_at',
+    'latest_used_hour_meter', 'avg_service', 'hours_after_maintained'
+]
+
+# Columns of a stored snapshot, the status table plus what later stages derive from it; product_id is
+# the product key of the interval estimator
+SNAPSHOT_COLUMNS = STATUS_COLUMNS + ['product_id', 'hours_per_day']
+
+# Rows without an asset code are recomputed together as one partition
+MISSING_PARTITION = '(no asset code)'
+
+# Rebuilds smaller than this run in process, below it the pool start up and pickling cost more than they save
+PARALLEL_MIN_ROWS = 200000
+
+
+def build_status_table(data):
+    return _build_status_rows(data)[STATUS_COLUMNS]
+
+
+def _service_rows(data):
+    # First half of the pipeline, the services of every product joined with the hour meter of their day
+
+    # Process 'hm_record' data
+    hm_data = data[data['source'] == 'hm_record'][['asset_category', 'asset_code', 'total_hour_meter', 'date']]
+    # Replace NaN values in 'asset_category' with "Unknown Category"
+    hm_data['asset_category'] = hm_data['asset_category'].fillna('Unknown Category')
+    hm_data = hm_data.rename(columns={'total_hour_meter': 'hour_meter', 'date': 'asset_used_at'}).drop_duplicates()
+    hm_data = hm_data.groupby(['asset_category', 'asset_code', 'asset_used_at'])['hour_meter'].max().reset_index()
+
+    # Process 'good_consume' data
+    gc_data = data[data['source'] == 'good_consume'][[
+        'asset_category', 'asset_code', 'asset_name', 'product_id', 'product_name',
+        'product_bought_qty', 'total_price', 'date', 'consume_id_good_consume', 'consume_id_assignment', 'due_date', 'fix_hm_record'
+    ]]
+    # Replace NaN values in 'asset_category' with "Unknown Category"
+    gc_data['asset_category'] = gc_data['asset_category'].fillna('Unknown Category')
+
+    # Product subcategories are assigned at query time from the offline clustering job (amtiss/product_clusters.py)
+
+    gc_agg = gc_data.groupby([
+        'asset_category', 'asset_code', 'asset_name', 'product_id',
+        'product_name', 'date', 'consume_id_good_consume'
+    ]).agg({
+        'product_bought_qty': 'sum',
+        'total_price': 'sum'
+    }).reset_index()
+
+    # Index of the assignment attributes of every consume id, built once per data load
+    consume_index = ConsumeIndex(data)
+
+    # Merge dataframes
+    merged_df = consume_index.join_services(gc_agg)
+
+    # Factorize the product key once, the group code is carried through the join
+    merged_df['service_group'] = service_group_codes(merged_df)
+
+    # Only hour meter readings taken on the service day are joined
+    filtered_df = join_service_day(merged_df, hm_data)
+    return hm_data, consume_index, merged_df, filtered_df
+
+
+def service_events(data):
+    # --Every service of the given rows with its interval, in service order, for the interval estimator
+    _, _, merged_df, filtered_df = _service_rows(data)
+    return service_intervals(merged_df, filtered_df)
+
+
+def _build_status_rows(data):
+    # Full pipeline from the join_hm_gc_c_ass rows to the maintenance status of every product
+    hm_data, consume_index, merged_df, filtered_df = _service_rows(data)
+
+    # Calculate 'serviced_when', its average and the service count per product in one pass
+    service_groups, df_new = service_interval_stats(merged_df, filtered_df)
+
+    # Prepare for final merges
+    hm_agg = hm_data.groupby(['asset_category', 'asset_code'], as_index=False).agg({
+        'asset_used_at': 'max',
+        'hour_meter': 'max'
+    }).rename(columns={'asset_used_at': 'latest_asset_used_at', 'hour_meter' : 'latest_used_hour_meter'})
+
+    df_new = pd.merge(df_new, hm_agg, on=['asset_category', 'asset_code'], how='outer')
+    df_new = pd.merge(df_new, utilization_rates(hm_data), on=['asset_category', 'asset_code'], how='left')
+    df_new = consume_index.attach_latest(df_new)
+
+    # Calculate 'hours_after_maintained'
+    df_new['latest_asset_used_at'] = pd.to_datetime(df_new['latest_asset_used_at'], errors='coerce')
+    df_new['latest_product_maintained_at'] = pd.to_datetime(df_new['latest_product_maintained_at'], errors='coerce')
+    df_new['hours_after_maintained'] = ((df_new['latest_used_hour_meter'] - df_new['maintained_hour_meter']))
+
+    # Define asset status
+    df_new['status'] = classify_status(df_new, df_new['avg_service'])
+
+    # Drop rows with null values in all columns of df_new
+    df_new.dropna(how='all', inplace=True)
+
+    # Final DataFrame, the assignment id stays for attributing rows without an asset code
+    return df_new[SNAPSHOT_COLUMNS + ['consume_id_assignment']].reset_index(drop=True)
+
+
+def partition_keys(asset_code):
+    return asset_code.astype(object).where(asset_code.notna(), MISSING_PARTITION).astype(str)
+
+
+def _consume_ids(column):
+    # --Consume ids comparable across the good_consume and assignment columns: float when both are numeric
+    # --(an integer id and the same id in a float column with NaN match), objects otherwise
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype='float64')
+    return column.astype(object).to_numpy()
+
+
+def consume_owners(data):
+    # --(consume_id, partition) of every assignment consume id: the assets of the good_consume rows it is
+    # --joined to through consume_id_good_consume, or the first partition recording it when no
+    # --good_consume row refers to it; assignment rows often carry no or another asset code
+    partition = partition_keys(data['asset_code'])
+    good_consume = (data['source'] == 'good_consume').to_numpy()
+    referenced = pd.DataFrame({
+        'consume_id': _consume_ids(data['consume_id_good_consume'])[good_consume],
+        'partition': partition.to_numpy()[good_consume]
+    }).dropna(subset=['consume_id'])
+    recorded = pd.DataFrame({
+        'consume_id': _consume_ids(data['consume_id_assignment']),
+        'partition': partition.to_numpy()
+    }).dropna(subset=['consume_id'])
+    referenced = referenced[referenced['consume_id'].isin(recorded['consume_id'])]
+    unreferenced = recorded[~recorded['consume_id'].isin(referenced['consume_id'])]
+    unreferenced = unreferenced.sort_values('partition', kind='stable').drop_duplicates('consume_id')
+    return pd.concat([referenced, unreferenced]).drop_duplicates(ignore_index=True)
+
+
+def row_owners(data, owners):
+    # --(row position, partition) of every partition a row is needed by: its own asset, and the owners
+    # --of the consume ids it records or refers to
+    positions = np.arange(len(data.index))
+    good_consume = (data['source'] == 'good_consume').to_numpy()
+    own = pd.DataFrame({'row': positions, 'partition': partition_keys(data['asset_code']).to_numpy()})
+    linked = pd.DataFrame({
+        'row': np.concatenate([positions, positions[good_consume]]),
+        'consume_id': np.concatenate([
+            _consume_ids(data['consume_id_assignment']),
+            _consume_ids(data['consume_id_good_consume'])[good_consume]
+        ])
+    }).dropna(subset=['consume_id']).merge(owners, on='consume_id')[['row', 'partition']]
+    return pd.concat([own, linked]).drop_duplicates(ignore_index=True)
+
+
+def partition_fingerprints(data, needed=None):
+    # --Order independent hash of the rows every asset needs, a changed hash means the asset has new data;
+    # --a row linked to other assets by its consume id counts for each of them
+    needed = row_owners(data, consume_owners(data)) if needed is None else needed
+    row_hash = pd.util.hash_pandas_object(data, index=False).to_numpy()
+    return pd.Series(row_hash[needed['row'].to_numpy()]).groupby(needed['partition'].to_numpy()).sum()
+
+
+def partition_rows(data, needed, partitions):
+    # --Rows needed to rebuild the given partitions, in data order; needed comes from row_owners
+    positions = np.unique(needed.loc[needed['partition'].isin(partitions), 'row'].to_numpy())
+    return data.iloc[positions]
+
+
+def build_partitions(data, owners=None, partitions=None):
+    # --Status rows of the given assets, tagged with the asset partition they belong to; with
+    # --`partitions`, only the rows of those partitions are kept, data has to hold every row they need
+    owners = consume_owners(data) if owners is None else owners
+    table = _build_status_rows(data)
+    partition = partition_keys(table['asset_code'])
+
+    # --Rows without an asset code come from an assignment id, they belong to the first owner of the id
+    id_partition = owners.sort_values('partition', kind='stable').drop_duplicates('consume_id').set_index('consume_id')['partition']
+    orphan = (table['asset_code'].isna() & table['consume_id_assignment'].notna()).to_numpy()
+    orphan_ids = _consume_ids(table.loc[orphan, 'consume_id_assignment'])
+    partition[orphan] = id_partition.reindex(orphan_ids).fillna(MISSING_PARTITION).to_numpy()
+
+    table = table[SNAPSHOT_COLUMNS].copy()
+    table['partition'] = partition.to_numpy()
+    if partitions is not None:
+        table = table[table['partition'].isin(partitions)].reset_index(drop=True)
+    return table
+
+
+def shard_keys(data):
+    # --Category shard of every asset partition, the category the asset is first seen with
+    partition = partition_keys(data['asset_code']).to_numpy()
+    category = data['asset_category'].fillna('Unknown Category')
+    return category.groupby(partition, sort=False).first()
+
+
+def build_sharded(data, workers=None, owners=None, partitions=None):
+    # --build_partitions run over asset categories on a process pool; categories are packed largest
+    # --first into one batch per worker, every batch gets the rows its assets need (rows linked to
+    # --several assets by consume id go to each of their batches) and keeps only the rows of its
+    # --assets, and the batches are concatenated in batch order whatever order they finish in, so the
+    # --result does not depend on the pool
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(data.index) < PARALLEL_MIN_ROWS:
+        return build_partitions(data, owners, partitions)
+
+    owners = consume_owners(data) if owners is None else owners
+    needed = row_owners(data, owners)
+    shards = shard_keys(data)
+    if partitions is not None:
+        shards = shards[shards.index.isin(partitions)]
+    needed = needed[needed['partition'].isin(shards.index)]
+    sizes = needed['partition'].map(shards).value_counts()
+    sizes = sizes.iloc[np.lexsort((sizes.index.to_numpy(dtype=str), -sizes.to_numpy()))]
+    batches = min(workers, len(sizes.index))
+    if batches < 2:
+        return build_partitions(data, owners, partitions)
+    load = np.zeros(batches)
+    batch_of = {}
+    for key, size in sizes.items():
+        batch = int(np.argmin(load))
+        batch_of[key] = batch
+        load[batch] += size
+    batch = shards.map(batch_of)
+    batch_partitions = [batch.index[(batch == i).to_numpy()] for i in range(batches)]
+
+    with ProcessPoolExecutor(max_workers=batches) as pool:
+        tables = list(pool.map(
+            build_partitions,
+            [partition_rows(data, needed, keys) for keys in batch_partitions],
+            [owners] * batches,
+            batch_partitions
+        ))
+    return pd.concat(tables, ignore_index=True)
+
+
+class StatusStore:
+    # Versioned snapshot of the status table, on disk (parquet + manifest) and in memory
+
+    def __init__(self, name='status_table', keep=5, workers=None):
+        self.name = name
+        self.keep = keep
+        self.workers = workers
+        self.estimator = IntervalEstimator(f'{name}_intervals')
+        self.lock = threading.Lock()
+        self.manifest = read_json(data_path(name, 'manifest.json'), default={'version': 0})
+        self.version = self.manifest['version']
+        self.data_version = self.manifest.get('data_version')
+        self.table = None
+        self.fingerprints = None
+        # --Objects notified with (previous rows, new rows, version) of the changed assets after every refresh
+        self.listeners = []
+        if self.version:
+            self.table = read_parquet(data_path(name, f'status_v{self.version}.parquet'))
+            fingerprints = read_parquet(data_path(name, f'fingerprints_v{self.version}.parquet'))
+            if self.table is not None and fingerprints is not None:
+                self.fingerprints = fingerprints.set_index('partition')['fingerprint']
+
+    def refresh(self, data, data_version=None):
+        # --Returns the current table, recomputing only the assets whose rows changed since the last snapshot;
+        # --with the content version of data (e.g. its hash from the page loader) an unchanged load is a lookup
+        with self.lock:
+            if data_version is not None and data_version == self.data_version and self.table is not None:
+                return self.table
+            owners = consume_owners(data)
+            needed = row_owners(data, owners)
+            fingerprints = partition_fingerprints(data, needed)
+            if self.table is None or self.fingerprints is None or not set(SNAPSHOT_COLUMNS) <= set(self.table.columns):
+                # --No usable snapshot, or one written before a column was added, everything is rebuilt
+                changed = fingerprints.index
+            else:
+                old, new = self.fingerprints.align(fingerprints)
+                changed = old.index[old.ne(new).to_numpy()]
+            # --The interval estimator folds in the services of the changed assets, all of them the first time
+            estimator_empty = self.estimator.empty
+            if estimator_empty:
+                self.estimator.update(service_events(data))
+            if self.table is not None and len(changed) == 0:
+                self.data_version = data_version
+                return self.table
+
+            # --Rows of other assets linked by consume id come along, their services are left out of the estimator
+            changed_data = partition_rows(data, needed, changed)
+            if not estimator_empty:
+                events = service_events(changed_data)
+                self.estimator.update(events[partition_keys(events['asset_code']).isin(changed).to_numpy()])
+
+            # --Only the changed assets are rebuilt, sharded by category when there are many of them
+            rebuilt = build_sharded(changed_data, self.workers, owners, changed)
+            if self.table is None:
+                previous = None
+                table = rebuilt
+            else:
+                replaced = self.table['partition'].isin(changed)
+                previous = self.table[replaced]
+                table = pd.concat([self.table[~replaced], rebuilt], ignore_index=True)
+            self._write(table, fingerprints, changed, data_version)
+            for listener in self.listeners:
+                listener.update(previous, rebuilt, self.version)
+            return self.table
+
+    def _write(self, table, fingerprints, changed, data_version=None):
+        version = self.version + 1
+        write_parquet(table, data_path(self.name, f'status_v{version}.parquet'))
+        write_parquet(
+            pd.DataFrame({'partition': fingerprints.index.astype(str), 'fingerprint': fingerprints.to_numpy()}),
+            data_path(self.name, f'fingerprints_v{version}.parquet')
+        )
+        self.manifest = {
+            'version': version,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'rows': len(table.index),
+            'changed_partitions': len(changed),
+            'data_version': data_version
+        }
+        write_json(self.manifest, data_path(self.name, 'manifest.json'))
+        self.version, self.table, self.fingerprints = version, table, fingerprints
+        self.data_version = data_version
+
+        # --Only the latest few versions are kept on disk
+        old = version - self.keep
+        while old > 0 and os.path.exists(data_path(self.name, f'status_v{old}.parquet')):
+            os.remove(data_path(self.name, f'status_v{old}.parquet'))
+            os.remove(data_path(self.name, f'fingerprints_v{old}.parquet'))
+            old -= 1
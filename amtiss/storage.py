@@ -0,0 +1,55 @@
+import json
+import os
+from collections import deque
+
+import pandas as pd
+
+# Local directory for everything the dashboards persist between runs (snapshots, feeds, models)
+DATA_DIR = os.environ.get('AMTISS_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.amtiss_data'))
+
+
+def data_path(*parts):
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def write_parquet(df, path):
+    # --Write next to the target first so readers never see a half written file
+    temporary = f'{path}.tmp'
+    df.to_parquet(temporary, index=False)
+    os.replace(temporary, path)
+
+
+def write_json(obj, path):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(obj, f, indent=2, default=str)
+    os.replace(temporary, path)
+
+
+def read_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_parquet(path):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def append_jsonl(records, path):
+    # --Append only log, one JSON object per line
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+def read_jsonl(path, limit=None):
+    # --The last `limit` records (all of them when None), oldest first
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        lines = deque(f, maxlen=limit)
+    return [json.loads(line) for line in lines if line.strip()]
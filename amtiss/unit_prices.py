@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.storage import data_path, read_json, read_parquet, write_json, write_parquet
+
+# Quantile sketch: unit price counts over log spaced bins 2% wide, so a quantile is off by 1% at most
+BIN_RATIO = 1.02
+
+# A purchase is flagged when it costs this many times the product's median and more than its p90,
+# for products bought at least MIN_PURCHASES times
+OUTLIER_RATIO = 3.0
+MIN_PURCHASES = 5
+
+PURCHASE_COLUMNS = [
+    'consume_id_good_consume', 'asset_category', 'asset_code', 'asset_name', 'product_id', 'product_name',
+    'date', 'product_bought_qty', 'total_price', 'unit_price'
+]
+
+
+def purchases(data):
+    # --One row per good_consume purchase (consume id, product) with its unit price
+    rows = data[(data['source'] == 'good_consume') & data['consume_id_good_consume'].notna() & data['product_id'].notna()]
+    rows = rows.drop_duplicates(['consume_id_good_consume', 'product_id'])
+    rows = rows[(rows['product_bought_qty'] > 0) & (rows['total_price'] > 0)]
+    rows = rows.assign(unit_price=rows['total_price'] / rows['product_bought_qty'])
+    return rows[PURCHASE_COLUMNS].reset_index(drop=True)
+
+
+def price_bins(unit_price):
+    return np.floor(np.log(unit_price) / np.log(BIN_RATIO)).astype('int64')
+
+
+class UnitPriceIndex:
+    # Unit price distribution of every product, as a sparse log binned sketch
+    # --(product_id, bin, count) rows; purchases are folded in once, by consume id
+
+    def __init__(self, name='unit_prices'):
+        self.name = name
+        self.manifest = read_json(data_path(name, 'manifest.json'), default={'version': 0})
+        self.version = self.manifest['version']
+        self.data_version = self.manifest.get('data_version')
+        sketch = read_parquet(data_path(name, 'sketch.parquet'))
+        seen = read_parquet(data_path(name, 'seen.parquet'))
+        self.sketch = sketch if sketch is not None else pd.DataFrame({'product_id': [], 'bin': pd.Series(dtype='int64'), 'count': pd.Series(dtype='int64')})
+        self.seen = seen if seen is not None else pd.DataFrame({'consume_id_good_consume': [], 'product_id': []})
+
+    def update(self, new_purchases, data_version=None):
+        # --Fold in the purchases the index has not seen yet, returns how many there were; with the content
+        # --version of the data the purchases come from, an already folded in version is skipped
+        if data_version is not None and data_version == self.data_version:
+            return 0
+        keys = ['consume_id_good_consume', 'product_id']
+        known = new_purchases[keys].merge(self.seen.assign(seen=True), on=keys, how='left')['seen'].notna().to_numpy()
+        fresh = new_purchases[~known]
+        self.data_version = data_version
+        if fresh.empty:
+            return 0
+
+        counts = fresh.assign(bin=price_bins(fresh['unit_price'].to_numpy())).groupby(['product_id', 'bin']).size().rename('count')
+        sketch = self.sketch.set_index(['product_id', 'bin'])['count']
+        self.sketch = sketch.add(counts, fill_value=0).astype('int64').reset_index()
+        self.seen = pd.concat([self.seen, fresh[keys]], ignore_index=True)
+
+        self.version += 1
+        write_parquet(self.sketch, data_path(self.name, 'sketch.parquet'))
+        write_parquet(self.seen, data_path(self.name, 'seen.parquet'))
+        self.manifest = {
+            'version': self.version,
+            'purchases': len(self.seen.index),
+            'products': int(self.sketch['product_id'].nunique()),
+            'data_version': data_version
+        }
+        write_json(self.manifest, data_path(self.name, 'manifest.json'))
+        return len(fresh.index)
+
+    def quantiles(self, qs=(0.25, 0.5, 0.75, 0.9)):
+        # --Purchase count and unit price quantiles of every product, read from the bin centers
+        sketch = self.sketch.sort_values(['product_id', 'bin'], ignore_index=True)
+        total = sketch.groupby('product_id')['count'].transform('sum')
+        cumulative = sketch.groupby('product_id')['count'].cumsum()
+        center = BIN_RATIO ** (sketch['bin'] + 0.5)
+        summary = sketch.groupby('product_id')['count'].sum().rename('purchases').to_frame()
+        for q in qs:
+            reached = sketch[(cumulative >= q * total).to_numpy()]
+            summary[f'p{int(q * 100)}'] = center[reached.index].groupby(reached['product_id'].to_numpy()).first()
+        return summary.reset_index()
+
+    def score(self, new_purchases):
+        # --Every purchase against its product's distribution, the ratio to the median and the flag
+        scored = new_purchases.merge(self.quantiles(), on='product_id', how='left')
+        scored['median_ratio'] = scored['unit_price'] / scored['p50']
+        scored['flagged'] = (
+            (scored['purchases'] >= MIN_PURCHASES) &
+            (scored['median_ratio'] >= OUTLIER_RATIO) &
+            (scored['unit_price'] > scored['p90'])
+        )
+        return scored
@@ -0,0 +1,83 @@
+# Benchmark of the service interval statistics of the overview page ('serviced_when', its average and
+# the service count), row by row apply vs the sorted single pass of service_interval_stats
+# Usage: python benchmarks/bench_serviced_when.py --rows 1000000
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from amtiss.maintenance import SERVICE_KEYS, service_group_codes, service_interval_stats
+
+
+def make_data(rows, seed=0):
+    # --Synthetic stand in for merged_df: many assets, a few products each, growing hour meters
+    rng = np.random.default_rng(seed)
+    asset = rng.integers(0, max(rows // 200, 1), rows)
+    product = rng.integers(0, 20, rows)
+    merged_df = pd.DataFrame({
+        'asset_category': 'CAT-' + (asset % 30).astype(str),
+        'asset_code': 'A-' + asset.astype(str),
+        'asset_name': 'Asset ' + asset.astype(str),
+        'product_id': product,
+        'product_name': 'Product ' + product.astype(str),
+        'consume_id_good_consume': np.arange(rows),
+        'fix_hm_record': rng.uniform(0, 20000, rows).round(),
+        'due_date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 700, rows), unit='D')
+    })
+    merged_df.loc[rng.random(rows) < 0.02, 'fix_hm_record'] = np.nan
+    merged_df['service_group'] = service_group_codes(merged_df)
+
+    # --Only part of merged_df survives the date filter, like on the page
+    filtered_df = merged_df[rng.random(rows) < 0.7].copy()
+    filtered_df = filtered_df.sort_values(by=SERVICE_KEYS + ['due_date'], kind='stable')
+    return merged_df, filtered_df
+
+
+def service_stats_apply(filtered_df, merged_df):
+    # --The original implementation of the page
+    filtered_df = filtered_df.copy()
+    filtered_df['serviced_when'] = filtered_df.groupby(SERVICE_KEYS)['fix_hm_record'].diff()
+    min_hour_meter = merged_df.groupby(SERVICE_KEYS)['fix_hm_record'].transform('min')
+    filtered_df['serviced_when'] = filtered_df.apply(
+        lambda row: row['fix_hm_record'] - min_hour_meter[row.name] if pd.isnull(row['serviced_when']) else row['serviced_when'],
+        axis=1
+    )
+    return filtered_df.groupby(SERVICE_KEYS).agg(
+        avg_service=('serviced_when', 'mean'),
+        service_count=('serviced_when', 'size')
+    ).round({'avg_service': 0}).reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    merged_df, filtered_df = make_data(args.rows)
+    print(f'merged_df rows: {len(merged_df)}, filtered_df rows: {len(filtered_df)}')
+
+    start = time.perf_counter()
+    expected = service_stats_apply(filtered_df, merged_df)
+    apply_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = service_interval_stats(merged_df, filtered_df)[0]
+    vectorized_seconds = time.perf_counter() - start
+
+    columns = SERVICE_KEYS + ['avg_service', 'service_count']
+    pd.testing.assert_frame_equal(
+        result[columns].sort_values(SERVICE_KEYS, ignore_index=True),
+        expected[columns].sort_values(SERVICE_KEYS, ignore_index=True),
+        check_dtype=False
+    )
+    print(f'apply:      {apply_seconds:.2f} s')
+    print(f'vectorized: {vectorized_seconds:.2f} s')
+    print(f'speedup:    {apply_seconds / vectorized_seconds:.1f}x (results identical)')
+
+
+if __name__ == '__main__':
+    main()
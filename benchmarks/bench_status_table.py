@@ -0,0 +1,96 @@
+# Benchmark of the status table build, one process vs sharded by asset category on a process pool
+# Usage: python benchmarks/bench_status_table.py --assets 3000 --workers 8
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from amtiss.status_table import build_partitions, build_sharded
+
+
+def make_data(assets, seed=0):
+    # --Synthetic stand in for join_hm_gc_c_ass: daily hour meter readings, consumes with assignments and
+    # --assignment rows of the consume ids without an asset code or with another asset's code
+    rng = np.random.default_rng(seed)
+    days = pd.date_range('2023-01-01', periods=365, freq='D')
+    asset_code = np.array([f'A-{i}' for i in range(assets)])
+    category = np.array([f'CAT-{i % 40}' for i in range(assets)])
+
+    hm_asset = np.repeat(np.arange(assets), len(days))
+    hm = pd.DataFrame({
+        'source': 'hm_record',
+        'asset_category': category[hm_asset],
+        'asset_code': asset_code[hm_asset],
+        'total_hour_meter': np.cumsum(rng.uniform(0, 12, len(hm_asset)).reshape(assets, -1), axis=1).ravel(),
+        'date': np.tile(days, assets)
+    })
+
+    consumes = assets * 40
+    gc_asset = rng.integers(0, assets, consumes)
+    gc_day = days[rng.integers(0, len(days), consumes)]
+    gc = pd.DataFrame({
+        'source': 'good_consume',
+        'asset_category': category[gc_asset],
+        'asset_code': asset_code[gc_asset],
+        'date': gc_day,
+        'asset_name': 'Asset ' + asset_code[gc_asset],
+        'product_id': rng.integers(0, 25, consumes),
+        'product_bought_qty': rng.integers(1, 4, consumes),
+        'total_price': rng.uniform(1e4, 1e7, consumes).round(),
+        'consume_id_good_consume': np.arange(consumes),
+        'consume_id_assignment': np.arange(consumes),
+        'due_date': gc_day,
+        'fix_hm_record': rng.uniform(0, 4000, consumes).round()
+    })
+    gc['product_name'] = 'Product ' + gc['product_id'].astype(str)
+
+    assigned = rng.choice(consumes, consumes // 4, replace=False)
+    assigned_day = gc_day[assigned] + pd.to_timedelta(rng.integers(0, 15, len(assigned)), unit='D')
+    other_asset = asset_code[rng.integers(0, assets, len(assigned))]
+    assignment = pd.DataFrame({
+        'source': 'assignment',
+        'asset_category': np.nan,
+        'asset_code': np.where(rng.random(len(assigned)) < 0.5, other_asset, None),
+        'date': assigned_day,
+        'consume_id_assignment': assigned.astype('float64'),
+        'due_date': assigned_day,
+        'fix_hm_record': rng.uniform(0, 4000, len(assigned)).round()
+    })
+    # --Some assignments of consume ids no good_consume row refers to
+    assignment.loc[::50, 'consume_id_assignment'] += consumes
+    return pd.concat([hm, gc, assignment], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--assets', type=int, default=3000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    data = make_data(args.assets)
+    print(f'rows: {len(data)}, workers: {args.workers}')
+
+    start = time.perf_counter()
+    expected = build_partitions(data)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = build_sharded(data, workers=args.workers)
+    sharded_seconds = time.perf_counter() - start
+
+    sort_columns = list(expected.columns)
+    pd.testing.assert_frame_equal(
+        result.sort_values(sort_columns, key=lambda column: column.astype(str), ignore_index=True),
+        expected.sort_values(sort_columns, key=lambda column: column.astype(str), ignore_index=True)
+    )
+    print(f'single:  {single_seconds:.2f} s')
+    print(f'sharded: {sharded_seconds:.2f} s')
+    print(f'speedup: {single_seconds / sharded_seconds:.1f}x (results identical)')
+
+
+if __name__ == '__main__':
+    main()
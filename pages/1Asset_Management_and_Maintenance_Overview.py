@@ -1,12 +1,18 @@
 import pandas as pd
-import numpy as np
 import streamlit as st
 import altair as alt
-# import re
-# from sklearn.feature_extraction.text import TfidfVectorizer
-# from sklearn.cluster import KMeans
 from google.oauth2 import service_account
 from google.cloud import bigquery
+from amtiss.detailed_view import detailed_view
+from amtiss.formatting import format_number, format_price
+from amtiss.intervals import INTERVAL_BASES
+from amtiss.product_clusters import ProductClusters
+from amtiss.projection import UTILIZATION_DAYS, weekly_workload
+from amtiss.status_alerts import ALERT_STATUSES, COUNTER_KEYS, AlertFeed, StatusCounter
+from amtiss.status_history import StatusHistory, overdue_over_time
+from amtiss.status_query import SORT_KEYS, StatusQuery
+from amtiss.status_table import StatusStore
+from amtiss.unit_prices import MIN_PURCHASES, OUTLIER_RATIO, UnitPriceIndex, purchases
 
 if 'sbstate' not in st.session_state:
     st.session_state.sbstate = 'collapsed'
@@ -54,10 +60,16 @@ st.write('')
 
 st.info("The data used in this are assets' products that are registered in either the assignment, good_consume, or hm_record datasets.")
 
-data=run_query(
+# --The query rows as a dataframe with a version of their content, hashed once per query load; the status
+# --store and the loaders below are keyed on the version instead of hashing the frame on every rerun
+@st.cache_data(ttl=600)
+def load_join_hm_gc_c_ass(query):
+    df = pd.DataFrame(run_query(query))
+    return df, str(int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+data, data_version = load_join_hm_gc_c_ass(
     "SELECT source, asset_category, asset_code, total_hour_meter, date, asset_name, product_id, product_name, product_bought_qty, total_price, consume_id_good_consume, consume_id_assignment, report_date, due_date, fix_hm_record FROM amtiss-dashboard-performance.amtiss_lma.join_hm_gc_c_ass ORDER BY date"
 )
-data = pd.DataFrame(data)
 
 # Load the necessary columns from the data
 # data = pd.read_csv('product_data.csv', usecols=[
@@ -66,235 +78,85 @@ data = pd.DataFrame(data)
 #     'total_price', 'consume_id_good_consume', 'consume_id_assignment', 'report_date', 'due_date', 'fix_hm_record'
 # ])
 
-# Process 'hm_record' data
-hm_data = data[data['source'] == 'hm_record'][['asset_category', 'asset_code', 'total_hour_meter', 'date']]
-# Replace NaN values in 'asset_category' with "Unknown Category"
-hm_data['asset_category'] = hm_data['asset_category'].fillna('Unknown Category')
-hm_data = hm_data.rename(columns={'total_hour_meter': 'hour_meter', 'date': 'asset_used_at'}).drop_duplicates()
-hm_data = hm_data.groupby(['asset_category', 'asset_code', 'asset_used_at'])['hour_meter'].max().reset_index()
-
-# Process 'good_consume' data
-gc_data = data[data['source'] == 'good_consume'][[
-    'asset_category', 'asset_code', 'asset_name', 'product_id', 'product_name',
-    'product_bought_qty', 'total_price', 'date', 'consume_id_good_consume', 'consume_id_assignment', 'due_date', 'fix_hm_record'
-]]
-# Replace NaN values in 'asset_category' with "Unknown Category"
-gc_data['asset_category'] = gc_data['asset_category'].fillna('Unknown Category')
-
-# To apply machine learning, uncomment the code below :
-# List of brand names to exclude
-# brand_names = ['toyota', 'mitsubishi', 'hino', 'dongfeng', 'mazda', 'ford', 'hilux', 
-#                'suzuki', 'triton', 'strada', 'dutro', 'bridgestone', 'innova', 'avanza', 
-#                'luxio', 'liugong', 'yukimura', 'weichai']
-
-# Preprocess the product names
-# def preprocess(text):
-#     text = re.sub(r'\b\w*\d\w*\b', '', text)  # Remove words containing digits
-#     for brand in brand_names:
-#         text = re.sub(r'\b' + re.escape(brand) + r'\b', '', text, flags=re.IGNORECASE)  # Remove brand names
-#     text = re.sub(r'[^a-zA-Z\s]', '', text)  # Remove special characters
-#     text = re.sub(r'\s+', ' ', text).strip()  # Remove extra spaces
-#     return text
-
-# Apply preprocessing to product names
-# gc_data['cleaned_product_name'] = gc_data['product_name'].apply(preprocess)
-# gc_data['cleaned_product_name'] = gc_data['cleaned_product_name'].apply(lambda x: ' '.join(x.split()[:2]))
-
-# Separate single-word and multi-word product names
-# single_word_df = gc_data[gc_data['cleaned_product_name'].str.split().str.len() == 1].copy()
-# multi_word_df = gc_data[gc_data['cleaned_product_name'].str.split().str.len() > 1].copy()
-
-# Process multi-word product names with TF-IDF and KMeans
-# vectorizer = TfidfVectorizer(ngram_range=(1, 1))
-# X = vectorizer.fit_transform(multi_word_df['cleaned_product_name'])
-
-# kmeans = KMeans(n_clusters=1000, random_state=0)  # Adjust n_clusters based on your needs
-# kmeans.fit(X)
-
-# Determine cluster labels based on the top 2 most common terms
-# terms = vectorizer.get_feature_names_out()
-# order_centroids = kmeans.cluster_centers_.argsort()[:, ::-1]
-
-# cluster_labels = []
-
-# for i in range(kmeans.n_clusters):
-#     top_terms = sorted(list(set(terms[ind] for ind in order_centroids[i, :2])))[::-1]   # Select only the top 2 terms and sort them
-#     cluster_labels.append(' '.join(top_terms))
-
-# Map cluster numbers to cluster labels
-# cluster_label_map = dict(enumerate(cluster_labels))
-# multi_word_df['product_subcategory'] = [cluster_label_map[label] for label in kmeans.labels_]
-
-# Assign single-word product names their own cluster labels
-# single_word_df['product_subcategory'] = single_word_df['cleaned_product_name']
-
-# Combine results
-# gc_data = pd.concat([single_word_df, multi_word_df])
-
-# Ensure cluster_label is consistent with desired output format
-# gc_data['product_subcategory'] = gc_data['product_subcategory'].astype(str)
-# gc_data['product_subcategory'] = gc_data['product_subcategory'].str.upper()
-
-# Drop the 'cleaned_product_name' column
-# gc_data.drop('cleaned_product_name', axis=1, inplace=True)
-
-# Optional: Reset index if necessary
-# gc_data.reset_index(drop=True, inplace=True)
-
-gc_agg = gc_data.groupby([
-    'asset_category', 'asset_code', 'asset_name', 'product_id', # 'product_subcategory',
-    'product_name', 'date', 'consume_id_good_consume'
-]).agg({
-    'product_bought_qty': 'sum',
-    'total_price': 'sum'
-}).reset_index()
-
-# Merge dataframes
-merged_df = pd.merge(gc_agg, gc_data[['consume_id_assignment', 'due_date', 'fix_hm_record']].drop_duplicates(), 
-                     left_on='consume_id_good_consume', right_on='consume_id_assignment', how='left')
-merged_df = pd.merge(merged_df, hm_data, on=['asset_category', 'asset_code'], how='outer')
-
-# Convert dates to datetime
-merged_df['due_date'] = pd.to_datetime(merged_df['due_date'], errors='coerce').dt.normalize()
-merged_df['asset_used_at'] = pd.to_datetime(merged_df['asset_used_at'], errors='coerce').dt.normalize()
-
-# Filter and sort data
-filtered_df = merged_df[merged_df['due_date'] == merged_df['asset_used_at']].copy()
-filtered_df = filtered_df.sort_values(by=['asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-                                          'product_id', 'due_date'])
-
-# Calculate 'serviced_when'
-filtered_df['serviced_when'] = filtered_df.groupby(['asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-                                                    'product_id'])['fix_hm_record'].diff()
-min_hour_meter = merged_df.groupby(['asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-                                    'product_id'])['fix_hm_record'].transform('min')
-filtered_df['serviced_when'] = filtered_df.apply(
-    lambda row: row['fix_hm_record'] - min_hour_meter[row.name] if pd.isnull(row['serviced_when']) else row['serviced_when'],
-    axis=1
+# The status table is a materialized snapshot, only assets whose rows changed are recomputed
+# --every refresh also updates the 'Needed service' counters and appends status changes to the alert feed
+@st.cache_resource
+def load_status_store():
+    store = StatusStore()
+    return store, StatusCounter(store), AlertFeed(store)
+
+# Product subcategory model, trained offline by `python -m amtiss.product_clusters`; reloaded every
+# 10 minutes so a retrained model is picked up without a restart
+@st.cache_resource(ttl=600)
+def load_product_clusters():
+    return ProductClusters()
+
+# Indexes, sort orders and due date projections are built once per snapshot version, interval basis, day
+# and subcategory model, filters and pages are then lookups; only the current and the previous key are
+# kept, every new version, basis or day would otherwise leave another query index in memory
+@st.cache_resource(max_entries=2)
+def load_status_query(version, basis, today, clusters_version):
+    store = load_status_store()[0]
+    product_clusters = load_product_clusters()
+    product_subcategories = product_clusters.assign(store.table['product_name']) if product_clusters.trained else None
+    return StatusQuery(store.table, store.estimator.intervals(), basis, today, product_subcategories)
+
+# Daily snapshots of the status table, for the status history over time
+@st.cache_resource
+def load_status_history():
+    return StatusHistory()
+
+status_store, needed_service_counter, alert_feed = load_status_store()
+status_store.refresh(data, data_version)
+
+# The service interval the 'Needed service' / 'Incoming Service' thresholds are based on
+interval_basis = st.radio(
+    'Service interval basis', list(INTERVAL_BASES), horizontal=True,
+    help='Mean of every past interval, median of the latest intervals (robust to a mis-keyed hour meter), or an exponentially weighted average favouring recent services'
 )
-
-# Calculate average 'serviced_when' and service count
-filtered_df['avg_serviced_when'] = filtered_df.groupby(['asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-                                                        'product_id'])['serviced_when'].transform('mean').round()
-filtered_df['service_count'] = filtered_df.groupby(['asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-                                                    'product_id'])['due_date'].transform('count')
-
-# Aggregate final data
-df_new = filtered_df.groupby([
-    'asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-    'product_name', 'service_count', 'consume_id_good_consume'
-], as_index=False).agg({
-    'avg_serviced_when': 'mean'
-}).rename(columns={'avg_serviced_when': 'avg_service'})
-
-# Prepare for final merges
-df2_agg = data[['consume_id_assignment', 'due_date', 'fix_hm_record']].drop_duplicates().groupby('consume_id_assignment').agg({
-    'due_date': 'max',
-    'fix_hm_record' : 'max'
-}).rename(columns={'due_date': 'latest_product_maintained_at', 'fix_hm_record' : 'maintained_hour_meter'}).reset_index()
-
-hm_agg = hm_data.groupby(['asset_category', 'asset_code'], as_index=False).agg({
-    'asset_used_at': 'max',
-    'hour_meter': 'max'
-}).rename(columns={'asset_used_at': 'latest_asset_used_at', 'hour_meter' : 'latest_used_hour_meter'})
-
-df_new = pd.merge(df_new, hm_agg, on=['asset_category', 'asset_code'], how='outer')
-df_new = pd.merge(df_new, df2_agg, left_on='consume_id_good_consume', right_on='consume_id_assignment', how='outer')
-
-# Calculate 'hours_after_maintained'
-df_new['latest_asset_used_at'] = pd.to_datetime(df_new['latest_asset_used_at'], errors='coerce')
-df_new['latest_product_maintained_at'] = pd.to_datetime(df_new['latest_product_maintained_at'], errors='coerce')
-df_new['hours_after_maintained'] = ((df_new['latest_used_hour_meter'] - df_new['maintained_hour_meter']))
-
-# Define asset status
-conditions = [
-    (df_new['hours_after_maintained'] > df_new['avg_service']),
-    (df_new['hours_after_maintained'] >= df_new['avg_service'] - 24) & (df_new['hours_after_maintained'] <= df_new['avg_service']),
-    (df_new['hours_after_maintained'] < df_new['avg_service']),
-    (df_new['product_name'].isna() & df_new['latest_asset_used_at'].notna())
-]
-choices = ['Needed service', 'Incoming Service', 'Good condition', 'Product not registered in good consume record']
-df_new['status'] = np.select(conditions, choices, default=np.nan)
-
-# Drop rows with null values in all columns of df_new
-df_new.dropna(how='all', inplace=True)
-
-# Final DataFrame
-df_final = df_new[[
-    'asset_category', 'asset_code', 'asset_name', # 'product_subcategory',
-    'product_name', 'status', 'service_count',
-    'latest_product_maintained_at', 'maintained_hour_meter','latest_asset_used_at', 
-    'latest_used_hour_meter','avg_service', 'hours_after_maintained'
-]]
+product_clusters = load_product_clusters()
+status_query = load_status_query(status_store.version, interval_basis, pd.Timestamp.today().normalize(), product_clusters.version)
+status_history = load_status_history()
+status_history.record(status_store.table, status_store.version)
 
 
 # Add filters for asset_category and asset_code using Streamlit
-asset_categories = df_final['asset_category'].unique()
+asset_categories = list(status_query.indexes['asset_category'])
 selected_asset_category = st.multiselect('Asset Category', asset_categories, default=[])
 
 if selected_asset_category:
-    filtered_codes = df_final[df_final['asset_category'].isin(selected_asset_category)]
-    asset_codes = filtered_codes['asset_code'].unique()
+    asset_codes = status_query.rows(categories=selected_asset_category)['asset_code'].dropna().unique()
 else:
-    asset_codes = df_final['asset_code'].unique()
+    asset_codes = list(status_query.indexes['asset_code'])
 
 selected_asset_code = st.multiselect('Asset Code', asset_codes, default=[])
 
 # Add filter for product_subcategory based on selected asset_category and asset_code
-# if selected_asset_category and selected_asset_code:
-#     filtered_subcategories = df_final[(df_final['asset_category'].isin(selected_asset_category)) & 
-#                                       (df_final['asset_code'].isin(selected_asset_code))]
-#     product_subcategories = filtered_subcategories['product_subcategory'].unique()
-# elif selected_asset_category:
-#     filtered_subcategories = df_final[df_final['asset_category'].isin(selected_asset_category)]
-#     product_subcategories = filtered_subcategories['product_subcategory'].unique()
-# elif selected_asset_code:
-#     filtered_subcategories = df_final[df_final['asset_code'].isin(selected_asset_code)]
-#     product_subcategories = filtered_subcategories['product_subcategory'].unique()
-# else:
-#     product_subcategories = df_final['product_subcategory'].unique()
-
-# selected_product_subcategory = st.multiselect('Product Subcategory', product_subcategories, default=[])
-
-# Filter the DataFrame based on selected filters
-if selected_asset_category and selected_asset_code: # and selected_product_subcategory:
-    filtered_df = df_final[(df_final['asset_category'].isin(selected_asset_category)) & 
-                           (df_final['asset_code'].isin(selected_asset_code))] # & 
-                           # (df_final['product_subcategory'].isin(selected_product_subcategory))]
-elif selected_asset_category and selected_asset_code:
-    filtered_df = df_final[(df_final['asset_category'].isin(selected_asset_category)) & 
-                           (df_final['asset_code'].isin(selected_asset_code))]
-elif selected_asset_category: # and selected_product_subcategory:
-    filtered_df = df_final[(df_final['asset_category'].isin(selected_asset_category))] # & 
-                           # (df_final['product_subcategory'].isin(selected_product_subcategory))]
-elif selected_asset_code: # and selected_product_subcategory:
-    filtered_df = df_final[(df_final['asset_code'].isin(selected_asset_code))] # & 
-                           # (df_final['product_subcategory'].isin(selected_product_subcategory))]
-elif selected_asset_category:
-    filtered_df = df_final[df_final['asset_category'].isin(selected_asset_category)]
-elif selected_asset_code:
-    filtered_df = df_final[df_final['asset_code'].isin(selected_asset_code)]
-# elif selected_product_subcategory:
-#     filtered_df = df_final[df_final['product_subcategory'].isin(selected_product_subcategory)]
+# --only offered once the offline clustering job has trained a model
+if product_clusters.trained:
+    product_subcategories = status_query.rows(
+        categories=selected_asset_category or None,
+        asset_codes=selected_asset_code or None
+    )['product_subcategory'].dropna().unique()
+    selected_product_subcategory = st.multiselect('Product Subcategory', sorted(product_subcategories), default=[])
 else:
-    filtered_df = df_final
-
+    selected_product_subcategory = []
 
-# Filter for products with status 'Needed Service'
-needed_service_df = filtered_df[filtered_df['status'] == 'Needed service']
+# An empty selection means no filter on that column
+filters = {
+    'categories': selected_asset_category or None,
+    'asset_codes': selected_asset_code or None,
+    'subcategories': selected_product_subcategory or None
+}
 
-# Count occurrences for needed services
-needed_service_count = needed_service_df.groupby(['asset_category', 'asset_code', 'asset_name']).size().reset_index(name='count')
 
-# Select the asset category to focus on
-if selected_asset_category:
-    selected_category_count = needed_service_count[needed_service_count['asset_category'].isin(selected_asset_category)]
+# Top 10 asset codes by number of products in 'Needed Service', read from the maintained counters
+# --the counters follow the status table, which is based on the mean interval
+if interval_basis == 'Mean' and not selected_product_subcategory:
+    top_10_asset_codes = needed_service_counter.top(10, categories=filters['categories'], asset_codes=filters['asset_codes'])
 else:
-    selected_category_count = needed_service_count
-
-# Sort and select the top 10 asset codes
-top_10_asset_codes = selected_category_count.sort_values(by='count', ascending=False).head(10)
-top_10_asset_codes = top_10_asset_codes[['asset_category', 'asset_code', 'asset_name', 'count']]
+    needed_service_count = status_query.rows(statuses=['Needed service'], **filters).groupby(COUNTER_KEYS).size().reset_index(name='count')
+    top_10_asset_codes = needed_service_count.nlargest(10, 'count')
 
 # Plotting the bar chart for the top 10 asset codes using Altair
 bar_chart = alt.Chart(top_10_asset_codes).mark_bar().encode(
@@ -313,42 +175,152 @@ st.write("### Top 10 Assets with Highest Number of Products in 'Needed Service'
 
 st.altair_chart(bar_chart, use_container_width=True)
 
+# Products coming due per week, from the projected due dates
+st.write("### Service Workload by Week")
+st.caption(f'Due dates are projected from each asset\'s hour meter usage over its last {UTILIZATION_DAYS} days of readings. Products already overdue are counted in the current week.')
+
+workload_df = weekly_workload(status_query.rows(statuses=['Needed service', 'Incoming Service', 'Good condition'], **filters))
+workload_chart = alt.Chart(workload_df).mark_bar().encode(
+    x=alt.X('yearmonthdate(week):O', title='Week Starting'),
+    y=alt.Y('products:Q', title='Number of Products Due'),
+    color=alt.Color('asset_category:N', title='Asset Category'),
+    tooltip=[
+        alt.Tooltip('yearmonthdate(week):O', title='Week Starting'),
+        alt.Tooltip('asset_category:N', title='Asset Category'),
+        alt.Tooltip('products:Q', title='Number of Products Due'),
+        alt.Tooltip('overdue:Q', title='Of Which Overdue')
+    ]
+)
+st.altair_chart(workload_chart, use_container_width=True)
+
+# Overdue products over time, replayed from the daily snapshots
+@st.cache_data(ttl=600)
+def load_overdue_over_time(start, end, by, last_day, last_version):
+    return overdue_over_time(status_history, start, end, by=by)
+
+st.write("### Products in 'Needed Service' Status Over Time")
+
+today = pd.Timestamp.today().normalize()
+history_range = st.date_input('History range', value=(today - pd.Timedelta(days=90), today), key='history_range')
+if len(history_range) == 2:
+    history_by = 'asset_code' if selected_asset_code else 'asset_category'
+    overdue_df = load_overdue_over_time(
+        history_range[0], history_range[1], history_by,
+        status_history.manifest['last_day'], status_history.manifest['last_version']
+    )
+    history_filter = selected_asset_code if selected_asset_code else selected_asset_category
+    if history_filter:
+        overdue_df = overdue_df[overdue_df[history_by].isin(history_filter)]
+    else:
+        # --Without a filter the whole fleet is one line
+        overdue_df = overdue_df.groupby('day', as_index=False)['count'].sum()
+        overdue_df[history_by] = 'All assets'
+
+    overdue_chart = alt.Chart(overdue_df).mark_line(point=True).encode(
+        x=alt.X('day:T', title='Date'),
+        y=alt.Y('count:Q', title='Number of Products Needed Service'),
+        color=alt.Color(f'{history_by}:N', title='Asset Code' if history_by == 'asset_code' else 'Asset Category'),
+        tooltip=[
+            alt.Tooltip('day:T', title='Date'),
+            alt.Tooltip(f'{history_by}:N', title='Asset Code' if history_by == 'asset_code' else 'Asset Category'),
+            alt.Tooltip('count:Q', title='Number of Products that Needed Service')
+        ]
+    )
+    st.altair_chart(overdue_chart, use_container_width=True)
+
+# Purchases priced far above what the rest of the fleet pays for the same product
+@st.cache_resource
+def load_unit_price_index():
+    return UnitPriceIndex()
+
+@st.cache_data(ttl=600)
+def load_purchases(version, _data):
+    return purchases(_data)
+
+@st.cache_data(ttl=600)
+def load_price_outliers(version, index_version, _all_purchases):
+    scored = load_unit_price_index().score(_all_purchases)
+    return scored[scored['flagged']].sort_values('median_ratio', ascending=False, ignore_index=True)
+
+# --Purchases are folded into the index once per data version
+unit_price_index = load_unit_price_index()
+all_purchases = load_purchases(data_version, data)
+unit_price_index.update(all_purchases, data_version)
+price_outliers = load_price_outliers(data_version, unit_price_index.version, all_purchases)
+if selected_asset_category:
+    price_outliers = price_outliers[price_outliers['asset_category'].isin(selected_asset_category)]
+if selected_asset_code:
+    price_outliers = price_outliers[price_outliers['asset_code'].isin(selected_asset_code)]
+
+st.write("### Purchases Priced Above the Fleet Norm")
+st.caption(f"Purchases whose unit price (total price / quantity bought) is at least {OUTLIER_RATIO:g} times the median unit price of the same product across the fleet and above its 90th percentile, for products bought at least {MIN_PURCHASES} times.")
+detailed_view(
+    price_outliers[[
+        'date', 'asset_category', 'asset_code', 'asset_name', 'product_name', 'product_bought_qty',
+        'total_price', 'unit_price', 'p50', 'p90', 'median_ratio'
+    ]].rename(columns={'p50': 'median_unit_price', 'p90': 'p90_unit_price'}),
+    key='price_outliers', page_size=20,
+    formatters={'total_price': format_price, 'unit_price': format_price, 'median_unit_price': format_price, 'p90_unit_price': format_price}
+)
+
+# Status changes detected by the latest refreshes
+recent_alerts = alert_feed.recent(200)
+with st.expander(f'Recent Status Changes ({len(recent_alerts)})'):
+    if recent_alerts.empty:
+        st.write('No status changes detected since the first snapshot.')
+    else:
+        recent_alerts = recent_alerts[recent_alerts['status_after'].isin(ALERT_STATUSES)] if st.checkbox('Only changes into Needed / Incoming Service', value=True) else recent_alerts
+        st.dataframe(recent_alerts.drop(columns=['version']), use_container_width=True)
+
 st.write("### Detailed Asset Information")
 
-# Add filter for status column
+# Add filter for status column and the order of the rows
 status_order = ['Needed service', 'Incoming Service', 'Good condition',  'Product not registered in good consume record']
-selected_statuses = st.multiselect('Filter by Status', status_order, default=status_order)
-
-# Apply status filter
-filtered_df = filtered_df[filtered_df['status'].isin(selected_statuses)]
+col1, col2 = st.columns([3, 1])
+with col1:
+    selected_statuses = st.multiselect('Filter by Status', status_order, default=status_order)
+with col2:
+    selected_sort = st.selectbox('Sort by', list(SORT_KEYS))
 
-# Pagination settings
+# Pagination settings, pages are fetched by cursor so the stack holds the cursor of every page visited
 rows_per_page = 20
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 0
+page_filters = (tuple(selected_statuses), tuple(selected_asset_category), tuple(selected_asset_code), tuple(selected_product_subcategory), selected_sort, interval_basis, status_store.version)
+if st.session_state.get('status_page_filters') != page_filters:
+    st.session_state.status_page_filters = page_filters
+    st.session_state.status_page_cursors = [None]
 
-# Pagination controls
-total_rows = len(filtered_df)
+total_rows = status_query.count(statuses=selected_statuses, **filters)
 total_pages = (total_rows // rows_per_page) + (total_rows % rows_per_page > 0)
 
 st.write(f'Total rows: {total_rows}, Total pages: {total_pages}')
 
-start_row = st.session_state.current_page * rows_per_page
-end_row = start_row + rows_per_page
+page_df, next_cursor = status_query.page(
+    statuses=selected_statuses,
+    sort=selected_sort,
+    after=st.session_state.status_page_cursors[-1],
+    limit=rows_per_page,
+    **filters
+)
 
-# Display the current page of data with reset index
-st.dataframe(filtered_df.iloc[start_row:end_row].reset_index(drop=True))
+# Display the current page of data, hour meter columns are formatted for the visible rows only
+for col in ['maintained_hour_meter', 'latest_used_hour_meter', 'avg_service', 'hours_after_maintained']:
+    page_df[col] = format_number(page_df[col])
+st.dataframe(page_df)
 
 # Pagination buttons
+def previous_page():
+    st.session_state.status_page_cursors.pop()
+
+def next_page():
+    st.session_state.status_page_cursors.append(next_cursor)
+
 col1, col2, _ = st.columns([2, 2, 6]) 
 
 with col1:
-    if st.button('Previous') and st.session_state.current_page > 0:
-        st.session_state.current_page -= 1
+    st.button('Previous', on_click=previous_page, disabled=len(st.session_state.status_page_cursors) == 1)
 
 with col2:
-    if st.button('Next') and end_row < total_rows:
-        st.session_state.current_page += 1
+    st.button('Next', on_click=next_page, disabled=next_cursor is None)
 
 # Explanation of each status
 st.write("### Explanation of Status:")
@@ -356,3 +328,4 @@ st.write("- **Needed service**: Products that have surpassed the average service
 st.write("- **Incoming Service**: Products that are approaching the average service interval within the next 24 hours, calculated from the latest asset ussage records in the hour meter.")
 st.write("- **Good condition**: Products that are within the average service interval and do not require immediate maintenance.")
 st.write("- **Product not registered in good consume record**: Products that doesn't have a valid product name but have a record in the hour meter dataset, suggesting they have not been registered for good consume dataset.")
+st.write("- **projected_due_date / due_in_days**: The date a product is expected to reach its service interval at the asset's recent daily hour meter usage, negative days mean it is already overdue.")
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.aggregates import period_aggregate
+
+
+def test_reset_rows_add_no_work_hours():
+    # --A reset day records the drop of the meter, negative or flagged, and must not lower the hours worked
+    df = pd.DataFrame({
+        'source': ['hm_record'] * 4 + ['good_consume'],
+        'asset_category': 'C1',
+        'asset_code': 'A1',
+        'date': pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-02']),
+        'month_column_1': '2024-01',
+        'hour_meter_per_date': [8.0, -950.0, 6.0, 420.0, np.nan],
+        'reset_hm': ['false', 'false', 'false', 'true', np.nan],
+        'total_price': [np.nan] * 4 + [700.0]
+    })
+    aggregate = period_aggregate(df, 'month_column_1')
+
+    assert len(aggregate.index) == 1
+    assert aggregate.loc[0, 'work_hours'] == 14.0
+    assert aggregate.loc[0, 'cost_per_hour'] == 50.0
+
+    # --A frame already carrying the corrected hours is aggregated as it is
+    carried = df.assign(corrected_hours=np.where(df['source'] == 'hm_record', 1.0, np.nan))
+    assert period_aggregate(carried, 'month_column_1').loc[0, 'work_hours'] == 4.0
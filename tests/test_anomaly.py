@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.anomaly import MIN_PERIODS, score_anomalies
+
+
+def make_aggregate(spike_at=None, assets=('A1', 'A2', 'A3'), periods=12, seed=0):
+    # --period_aggregate like rows, cost per hour around 100 for every asset of one category
+    rng = np.random.default_rng(seed)
+    rows = []
+    for code in assets:
+        for period in range(periods):
+            cost_per_hour = 100 + rng.normal(0, 5)
+            if (code, period) == spike_at:
+                cost_per_hour *= 6
+            rows.append({'asset_category': 'C1', 'asset_code': code, 'period': f'2024-{period + 1:02d}', 'cost_per_hour': cost_per_hour})
+    return pd.DataFrame(rows)
+
+
+def test_spike_is_flagged_once():
+    scored = score_anomalies(make_aggregate(spike_at=('A2', 9)))
+    flagged = scored[scored['flagged']]
+    assert flagged[['asset_code', 'period']].values.tolist() == [['A2', '2024-10']]
+
+
+def test_first_periods_have_no_own_history():
+    scored = score_anomalies(make_aggregate())
+    first = scored.groupby('asset_code').head(MIN_PERIODS)
+    assert first['rolling_median'].isna().all()
+    assert scored.groupby('asset_code').nth(MIN_PERIODS)['rolling_median'].notna().all()
+
+
+def test_rows_without_asset_code_are_their_own_series():
+    # --A missing asset code must not join, or break, the history of another asset
+    aggregate = make_aggregate(spike_at=('A2', 9))
+    unknown = make_aggregate(assets=('A9',), seed=1).assign(asset_code=np.nan, cost_per_hour=lambda df: df['cost_per_hour'] * 20)
+    scored = score_anomalies(pd.concat([aggregate, unknown], ignore_index=True))
+
+    known = scored[scored['asset_code'].notna()].reset_index(drop=True)
+    pd.testing.assert_series_equal(known['robust_z'], score_anomalies(aggregate)['robust_z'])
+    assert scored.loc[scored['asset_code'].isna(), 'rolling_median'].dropna().between(1500, 2500).all()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+
+from amtiss.detailed_view import table_window
+
+
+def make_table():
+    return pd.DataFrame({
+        'asset_code': ['A1', 'a2', 'B3', 'A4', None],
+        'product_name': ['Oil filter', 'Air filter', 'Oil filter', 'Belt', 'Oil'],
+        'total_price': [300.0, np.nan, 100.0, 200.0, 50.0]
+    })
+
+
+def test_search_sort_and_page():
+    df = make_table()
+    window, total_rows = table_window(df, search='a', sort_by='total_price', ascending=False, page=0, page_size=2)
+    assert total_rows == 3
+    assert window['asset_code'].tolist() == ['A1', 'A4']
+    window, _ = table_window(df, search='a', sort_by='total_price', ascending=False, page=1, page_size=2)
+    # --Missing values sort last in both directions
+    assert window['asset_code'].tolist() == ['a2']
+
+
+def test_search_skips_numeric_columns_and_missing_values():
+    df = make_table()
+    assert table_window(df, search='300')[1] == 0
+    assert table_window(df, search='none')[1] == 0
+    assert table_window(df, search='OIL')[0]['product_name'].tolist() == ['Oil filter', 'Oil filter', 'Oil']
+
+
+def test_window_without_search_or_sort():
+    window, total_rows = table_window(make_table(), page=2, page_size=2)
+    assert total_rows == 5
+    assert window['product_name'].tolist() == ['Oil']
+    assert window.index.tolist() == [0]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.forecast import HORIZON_MONTHS, ForecastStore, label_format
+
+
+def make_costs(months=30, month_format='%b %Y', quarter_format='Q%q %Y'):
+    # --union_hm_gc like good_consume rows, two purchases a month for one asset, with period labels
+    dates = pd.date_range('2022-01-01', periods=months, freq='MS') + pd.Timedelta(days=4)
+    dates = dates.repeat(2)
+    periods = pd.PeriodIndex(dates.to_period('M'))
+    return pd.DataFrame({
+        'source': 'good_consume',
+        'asset_category': 'C1',
+        'asset_code': 'A1',
+        'date': dates,
+        'total_price': 1000.0 + np.arange(len(dates)) * 10,
+        'month_column_1': periods.strftime(month_format),
+        'quarter_column_1': periods.asfreq('Q').strftime(quarter_format)
+    })
+
+
+def test_label_format_matches_the_period_columns():
+    assert label_format(make_costs(), 'Monthly') == '%b %Y'
+    assert label_format(make_costs(), 'Quarter') == 'Q%q %Y'
+    assert label_format(make_costs(month_format='%Y-%m', quarter_format='%Y-Q%q'), 'Monthly') == '%Y-%m'
+    assert label_format(make_costs(month_format='%Y-%m', quarter_format='%Y-Q%q'), 'Quarter') == '%Y-Q%q'
+
+
+def test_label_format_without_a_match():
+    df = make_costs()
+    df['month_column_1'] = 'month ' + df['month_column_1']
+    df['quarter_column_1'] = df['quarter_column_1'].str.lower()
+    assert label_format(df, 'Monthly') is None
+    assert label_format(df, 'Quarter') is None
+
+
+def test_forecasts_follow_the_charted_periods(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    store = ForecastStore()
+    assert store.refresh(make_costs())
+
+    # --30 months from Jan 2022 end in Jun 2024, forecasts run Jul to Dec 2024
+    monthly = store.lookup('asset_code', ['A1'], 'Monthly')
+    assert monthly['month_column_1'].tolist() == ['Jul 2024', 'Aug 2024', 'Sep 2024', 'Oct 2024', 'Nov 2024', 'Dec 2024']
+    quarters = store.lookup('asset_code', ['A1'], 'Quarter')
+    assert quarters['quarter_column_1'].tolist() == ['Q3 2024', 'Q4 2024']
+    np.testing.assert_allclose(quarters['forecast'].sum(), monthly['forecast'].sum())
+    assert len(monthly.index) == HORIZON_MONTHS
+
+
+def test_lookup_without_a_label_format(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    df = make_costs()
+    df['quarter_column_1'] = df['quarter_column_1'].str.lower()
+    store = ForecastStore()
+    store.refresh(df)
+    assert store.lookup('asset_code', ['A1'], 'Quarter') is None
+    assert len(store.lookup('asset_code', ['A1'], 'Monthly').index) == HORIZON_MONTHS
@@ -0,0 +1,44 @@
+import numpy as np
+
+from amtiss.formatting import format_number, format_price
+
+
+def per_value_price(price):
+    # --The per value formatter format_price replaced
+    if price >= 1000000000000:
+        formatted_price = f"Rp {price / 1000000000000:.2f} T"
+    elif price >= 1000000000:
+        formatted_price = f"Rp {price / 1000000000:.2f} M"
+    elif price >= 1000000:
+        formatted_price = f"Rp {price / 1000_000:.2f} jt"
+    elif price >= 1000:
+        formatted_price = f"Rp {price / 1000:.2f} rb"
+    else:
+        formatted_price = f"Rp {price:.2f}"
+    return formatted_price.replace('.', ',')
+
+
+def per_value_number(price):
+    return per_value_price(price)[3:] if price >= 1000 else f"{price:.0f}".replace('.', ',')
+
+
+def test_parity_with_the_per_value_formatters():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.lognormal(8, 5, 20000),
+        rng.normal(0, 1, 5000),
+        # --Ties at every scale, small negatives and negative zero
+        np.arange(-50, 50) + 0.5,
+        np.round(rng.lognormal(6, 4, 5000)) * 5,
+        np.arange(-1, 1, 0.001),
+        [0.0, -0.0, -0.3, -0.5, 0.125, 2.675, 999.5, 999.995, 1005.0, 999999.995, 1e20, -1e20]
+    ])
+    assert format_price(values).tolist() == [per_value_price(value) for value in values]
+    assert format_number(values).tolist() == [per_value_number(value) for value in values]
+
+
+def test_scalars_and_missing_values():
+    assert format_price(1234567.0) == 'Rp 1,23 jt'
+    assert format_number(-0.3) == '-0'
+    assert format_number(2.5) == '2'
+    assert format_price(np.array([np.nan, 1500.0])).tolist() == ['', 'Rp 1,50 rb']
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.heatmap import UNKNOWN_ROW, heatmap_matrix
+
+
+def make_aggregate(with_unknown):
+    aggregate = pd.DataFrame({
+        'asset_category': ['C1', 'C1', 'C1', 'C2'],
+        'asset_code': ['A1', 'A1', 'A2', 'A3'],
+        'period': ['2024-01', '2024-02', '2024-02', '2024-01'],
+        'maintenance_cost': [100.0, 200.0, 50.0, 70.0],
+        'work_hours': [10.0, 20.0, 5.0, 7.0]
+    })
+    if with_unknown:
+        unknown = pd.DataFrame({
+            'asset_category': [np.nan, np.nan, 'C1'],
+            'asset_code': [np.nan, 'A9', 'A1'],
+            'period': ['2024-02', '2024-02', np.nan],
+            'maintenance_cost': [1000.0, 500.0, 300.0],
+            'work_hours': [100.0, 50.0, 30.0]
+        })
+        aggregate = pd.concat([aggregate, unknown], ignore_index=True)
+    aggregate['cost_per_hour'] = aggregate['maintenance_cost'] / aggregate['work_hours']
+    return aggregate
+
+
+def row_totals(aggregate, row_key, metric):
+    matrix = heatmap_matrix(aggregate, row_key, metric, order='Name')
+    return matrix.groupby('row')['value'].sum()
+
+
+def test_missing_keys_do_not_change_other_rows():
+    for row_key in ['asset_code', 'asset_category']:
+        for metric in ['maintenance_cost', 'work_hours']:
+            clean = row_totals(make_aggregate(False), row_key, metric)
+            with_unknown = row_totals(make_aggregate(True), row_key, metric)
+            pd.testing.assert_series_equal(with_unknown.reindex(clean.index), clean)
+
+
+def test_missing_keys_get_their_own_row():
+    totals = row_totals(make_aggregate(True), 'asset_code', 'maintenance_cost')
+    assert totals[UNKNOWN_ROW] == 1000.0
+    assert totals['A1'] == 300.0
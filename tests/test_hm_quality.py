@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.hm_quality import hour_meter_quality
+
+
+def test_scan_with_missing_keys():
+    # --Readings of an asset without category and of one without asset code, as in union_hm_gc
+    dates = pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-20', '2024-01-01', '2024-01-03'])
+    df = pd.DataFrame({
+        'source': 'hm_record',
+        'asset_category': [np.nan, np.nan, np.nan, np.nan, 'C1', 'C1'],
+        'asset_code': ['A1', 'A1', 'A1', 'A1', np.nan, np.nan],
+        'date': dates,
+        'hour_meter_per_date': [8.0, 30.0, 5.0, -3.0, 6.0, np.nan],
+        'reset_hm': ['false'] * 6
+    })
+    rows, assets = hour_meter_quality(df)
+
+    assert len(rows.index) == len(df.index)
+    assert rows.loc[[1, 2], 'duplicates'].sum() == 1
+    assert rows.loc[1, 'too_large'] and rows.loc[3, 'negative'] and rows.loc[5, 'missing']
+
+    assets = assets.set_index('asset_code', drop=False)
+    assert assets.loc['A1', 'readings'] == 4
+    assert assets.loc['A1', 'longest_gap_days'] == 18
+    assert assets.loc['A1', 'gaps'] == 1
+    unknown = assets[assets['asset_code'].isna()].iloc[0]
+    assert unknown['readings'] == 2 and unknown['missing'] == 1
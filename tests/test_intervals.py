@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from amtiss.intervals import EWMA_ALPHA, WINDOW, IntervalEstimator
+
+
+def make_events(intervals, product_id=1, start='2024-01-01'):
+    # --service_events rows of one (asset, product), one service a day
+    n = len(intervals)
+    return pd.DataFrame({
+        'asset_category': 'C1',
+        'asset_code': 'A1',
+        'asset_name': 'Name A1',
+        'product_id': product_id,
+        'product_name': 'Oil filter',
+        'due_date': pd.date_range(start, periods=n, freq='D'),
+        'fix_hm_record': np.cumsum(intervals),
+        'interval': intervals
+    })
+
+
+@pytest.fixture
+def estimator(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    return IntervalEstimator()
+
+
+def test_incremental_updates_match_one_update(estimator):
+    rng = np.random.default_rng(0)
+    events = pd.concat([make_events(rng.uniform(100, 400, 50), product_id) for product_id in [1, 2]], ignore_index=True)
+    # --The first services, then every service: those already folded in are skipped
+    estimator.update(events.groupby('product_id').head(20))
+    estimator.update(events)
+    incremental = estimator.intervals()
+
+    estimator.reset()
+    estimator.update(events)
+    pd.testing.assert_frame_equal(incremental, estimator.intervals())
+
+
+def test_running_statistics(estimator):
+    values = np.arange(1.0, 41.0) * 10
+    estimator.update(make_events(values[:25]))
+    estimator.update(make_events(values, start='2024-01-01'))
+    intervals = estimator.intervals().iloc[0]
+
+    ewma = values[0]
+    for value in values[1:]:
+        ewma = EWMA_ALPHA * value + (1 - EWMA_ALPHA) * ewma
+    assert intervals['count'] == 40
+    assert intervals['mean_service'] == np.round(values.mean())
+    # --The median is taken over the latest WINDOW intervals only
+    assert intervals['median_service'] == np.round(np.median(values[-WINDOW:]))
+    assert intervals['ewma_service'] == np.round(ewma)
+    assert intervals['last_fix_hm_record'] == values.sum()
+
+
+def test_products_keep_their_own_state(estimator):
+    # --Two product ids sharing a name are separate estimates
+    estimator.update(pd.concat([make_events([100.0] * 5, 1), make_events([300.0] * 5, 2)], ignore_index=True))
+    intervals = estimator.intervals().set_index('product_id')
+    assert intervals.loc[1, 'median_service'] == 100 and intervals.loc[2, 'median_service'] == 300
+
+
+def test_state_is_persisted(estimator):
+    estimator.update(make_events([120.0, 130.0, 140.0]))
+    pd.testing.assert_frame_equal(IntervalEstimator().intervals(), estimator.intervals(), check_dtype=False)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.resets import corrected_hours, corrected_series, reset_events
+
+
+def make_readings():
+    # --Daily hours of two assets, given out of order; A1's meter goes back on the 3rd and is flagged
+    # --as reset on the 5th
+    return pd.DataFrame({
+        'source': ['hm_record'] * 7 + ['good_consume'],
+        'asset_category': ['C1'] * 5 + ['C2'] * 2 + ['C1'],
+        'asset_code': ['A1', 'A1', 'A1', 'A1', 'A1', 'A2', 'A2', 'A1'],
+        'date': pd.to_datetime(['2024-01-02', '2024-01-01', '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-01', '2024-01-02', '2024-01-02']),
+        'hour_meter_per_date': [8.0, 10.0, -500.0, 6.0, 12.0, np.nan, 5.0, np.nan],
+        'reset_hm': ['false', 'false', 'false', 'false', 'True', 'false', 'false', None]
+    })
+
+
+def test_corrected_hours():
+    readings = make_readings().iloc[:7]
+    assert corrected_hours(readings).tolist() == [8.0, 10.0, 0.0, 6.0, 0.0, 0.0, 5.0]
+
+
+def test_corrected_hour_meter_never_goes_back():
+    series = corrected_series(make_readings())
+    a1 = series[series['asset_code'] == 'A1']
+    assert a1['date'].is_monotonic_increasing
+    assert a1['corrected_hour_meter'].tolist() == [10.0, 18.0, 18.0, 24.0, 24.0]
+    assert series[series['asset_code'] == 'A2']['corrected_hour_meter'].tolist() == [0.0, 5.0]
+
+
+def test_reset_events():
+    events = reset_events(corrected_series(make_readings()))
+    assert events['date'].dt.day.tolist() == [3, 5]
+    assert events['pre_reset_reading'].tolist() == [18.0, 24.0]
+    assert events['post_reset_reading'].tolist() == [-500.0, 12.0]
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from amtiss.status_history import StatusHistory, overdue_over_time
+
+
+def make_table(statuses):
+    # --Status table rows of two categories; the two 'Oil filter' rows of A1 share every key
+    return pd.DataFrame({
+        'asset_category': ['C1', 'C1', 'C1', 'C2'],
+        'asset_code': ['A1', 'A1', 'A2', 'A3'],
+        'asset_name': ['Name A1', 'Name A1', 'Name A2', 'Name A3'],
+        'product_name': ['Oil filter', 'Oil filter', 'Oil filter', None],
+        'status': statuses
+    })
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    return StatusHistory()
+
+
+def counts_by_day(counts, by='asset_category'):
+    return {(str(row.day.date()), getattr(row, by)): row.count for row in counts.itertuples()}
+
+
+def test_daily_counts_are_replayed_from_the_changes(history):
+    history.record(make_table(['Needed service', 'Good condition', 'Needed service', None]), 'v1', '2024-03-30')
+    history.record(make_table(['Needed service', 'Needed service', 'Good condition', None]), 'v2', '2024-03-31')
+    # --A new month starts with a full state, days without a record keep the previous state
+    history.record(make_table(['Good condition', 'Needed service', 'Good condition', 'Needed service']), 'v3', '2024-04-02')
+
+    overdue = counts_by_day(overdue_over_time(history, '2024-03-30', '2024-04-03'))
+    assert overdue == {
+        ('2024-03-30', 'C1'): 2,
+        ('2024-03-31', 'C1'): 2,
+        ('2024-04-02', 'C1'): 1, ('2024-04-02', 'C2'): 1,
+        ('2024-04-03', 'C1'): 1, ('2024-04-03', 'C2'): 1
+    }
+    # --Rows sharing every key are told apart by their order
+    assert len(history.rows.index) == 4
+
+
+def test_rerecording_a_day_replaces_it(history):
+    history.record(make_table(['Needed service'] * 4), 'v1', '2024-03-01')
+    history.record(make_table(['Needed service'] * 4), 'v2', '2024-03-02')
+    history.record(make_table(['Good condition'] * 4), 'v3', '2024-03-02')
+
+    counts = history.status_counts('2024-03-01', '2024-03-02', statuses=['Needed service', 'Good condition'])
+    assert counts_by_day(counts[counts['status'] == 'Good condition']) == {('2024-03-02', 'C1'): 3, ('2024-03-02', 'C2'): 1}
+    assert counts_by_day(counts[counts['status'] == 'Needed service']) == {('2024-03-01', 'C1'): 3, ('2024-03-01', 'C2'): 1}
+
+
+def test_removed_rows_stop_counting(history):
+    history.record(make_table(['Needed service'] * 4), 'v1', '2024-03-01')
+    history.record(make_table(['Needed service'] * 4).iloc[2:], 'v2', '2024-03-02')
+
+    overdue = counts_by_day(overdue_over_time(history, '2024-03-01', '2024-03-02'))
+    assert overdue == {('2024-03-01', 'C1'): 3, ('2024-03-01', 'C2'): 1, ('2024-03-02', 'C1'): 1, ('2024-03-02', 'C2'): 1}
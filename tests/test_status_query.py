@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from amtiss.intervals import IntervalEstimator
+from amtiss.status_query import StatusQuery, service_interval
+from amtiss.status_table import build_partitions, service_events
+from test_status_table import make_data
+
+
+def test_service_interval_joins_on_product_id():
+    # --Two products sharing a name on the same asset keep their own interval
+    keys = {'asset_category': 'C1', 'asset_code': 'A1', 'asset_name': 'Name A1', 'product_name': 'Oil filter'}
+    table = pd.DataFrame({**keys, 'product_id': [1, 2, 3], 'avg_service': [250.0, 500.0, 100.0]})
+    intervals = pd.DataFrame({**keys, 'product_id': [2, 1], 'median_service': [480.0, 260.0]})
+
+    assert service_interval(table, intervals, 'median_service').tolist() == [260.0, 480.0, 100.0]
+
+
+def test_query_basis_uses_estimator_intervals(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    data = make_data()
+    # --Every product name is shared by two product ids
+    data['product_name'] = data['product_name'].where(data['product_id'].isna(), 'P' + (data['product_id'] // 2).astype(str))
+    estimator = IntervalEstimator()
+    estimator.update(service_events(data))
+    intervals = estimator.intervals()
+
+    query = StatusQuery(build_partitions(data), intervals, basis='Median')
+    rows = query.table.merge(intervals, on=['asset_category', 'asset_code', 'asset_name', 'product_id'], how='inner')
+    assert len(rows.index) > 0
+    known = rows['median_service'].notna().to_numpy()
+    np.testing.assert_array_equal(rows.loc[known, 'avg_service'], rows.loc[known, 'median_service'])
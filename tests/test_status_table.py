@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import amtiss.status_table as status_table
+from amtiss import storage
+from amtiss.status_table import StatusStore, build_partitions, build_sharded
+
+
+def make_data(assets=24, days=120, services=600, seed=0):
+    # --join_hm_gc_c_ass like rows: daily hour meter readings, good_consume rows carrying their
+    # --assignment, and assignment rows of the same consume ids without an asset code or with another one
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    codes = np.array([f'A{i}' for i in range(assets)])
+    categories = np.array([f'C{i % 4}' for i in range(assets)])
+
+    asset, day = np.divmod(np.arange(assets * days), days)
+    hm = pd.DataFrame({
+        'source': 'hm_record',
+        'asset_category': categories[asset],
+        'asset_code': codes[asset],
+        'total_hour_meter': day * 8.0 + asset,
+        'date': dates[day]
+    })
+
+    asset = rng.integers(0, assets, services)
+    day = rng.integers(0, days, services)
+    product = rng.integers(0, 5, services)
+    consume_id = np.arange(services)
+    gc = pd.DataFrame({
+        'source': 'good_consume',
+        'asset_category': categories[asset],
+        'asset_code': codes[asset],
+        'asset_name': np.char.add('Name ', codes[asset]),
+        'product_id': product,
+        'product_name': np.char.add('P', product.astype(str)),
+        'product_bought_qty': rng.integers(1, 4, services),
+        'total_price': rng.integers(1, 100, services) * 1000.0,
+        'date': dates[day],
+        'consume_id_good_consume': consume_id,
+        'consume_id_assignment': consume_id.astype('float64'),
+        'due_date': dates[day],
+        'fix_hm_record': day * 8.0 + asset
+    })
+
+    picked = rng.choice(services, services // 3, replace=False)
+    later = np.minimum(day[picked] + rng.integers(0, 10, len(picked)), days - 1)
+    other = codes[rng.integers(0, assets, len(picked))]
+    assignment = pd.DataFrame({
+        'source': 'assignment',
+        'asset_category': np.nan,
+        'asset_code': np.where(rng.random(len(picked)) < 0.5, other, None),
+        'date': dates[later],
+        'consume_id_assignment': consume_id[picked].astype('float64'),
+        'due_date': dates[later],
+        'fix_hm_record': later * 8.0 + 1
+    })
+    # --A few assignments of ids no good_consume row refers to
+    assignment.loc[:4, 'consume_id_assignment'] += 10000
+    return pd.concat([hm, gc, assignment], ignore_index=True)
+
+
+def sorted_rows(table):
+    return table.sort_values(list(table.columns), key=lambda column: column.astype(str), ignore_index=True)
+
+
+def assert_same_table(table, expected):
+    pd.testing.assert_frame_equal(sorted_rows(table), sorted_rows(expected), check_dtype=False)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'DATA_DIR', str(tmp_path))
+    return StatusStore(workers=1)
+
+
+def test_refresh_matches_full_rebuild(store):
+    data = make_data()
+    assert_same_table(store.refresh(data), build_partitions(data))
+
+    hour_meter = data.copy()
+    hour_meter.loc[(hour_meter['source'] == 'hm_record') & (hour_meter['asset_code'] == 'A3'), 'total_hour_meter'] += 50
+    assert_same_table(store.refresh(hour_meter), build_partitions(hour_meter))
+
+    consume = hour_meter.copy()
+    consume.loc[consume.index[consume['source'] == 'good_consume'][:3], 'due_date'] += pd.Timedelta(days=2)
+    assert_same_table(store.refresh(consume), build_partitions(consume))
+
+    assignment = consume.copy()
+    assignment_rows = assignment.index[assignment['source'] == 'assignment']
+    assignment.loc[assignment_rows[:10], 'due_date'] += pd.Timedelta(days=5)
+    assignment.loc[assignment_rows[:10], 'fix_hm_record'] += 40
+    assert_same_table(store.refresh(assignment), build_partitions(assignment))
+    assert store.manifest['changed_partitions'] < assignment['asset_code'].nunique()
+
+
+def test_sharded_build_matches_serial(monkeypatch):
+    monkeypatch.setattr(status_table, 'PARALLEL_MIN_ROWS', 0)
+    data = make_data()
+    assert_same_table(build_sharded(data, workers=4), build_partitions(data))
+
+
+def test_refresh_skips_unchanged_data_version(store):
+    data = make_data()
+    table = store.refresh(data, 'v1')
+    version = store.version
+
+    # --Same data version: the snapshot is returned without looking at the rows
+    changed = data.copy()
+    changed.loc[changed['source'] == 'hm_record', 'total_hour_meter'] += 50
+    assert store.refresh(changed, 'v1') is table
+
+    # --New data version with the same rows: fingerprints match and no snapshot is written
+    assert store.refresh(data, 'v2') is table
+    assert store.version == version
+
+    assert_same_table(store.refresh(changed, 'v3'), build_partitions(changed))
+    assert store.version == version + 1
+    assert StatusStore(workers=1).data_version == 'v3'
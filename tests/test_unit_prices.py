@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from amtiss.unit_prices import BIN_RATIO, UnitPriceIndex, purchases
+
+
+def make_data(n=200, seed=0):
+    # --good_consume rows of two products around 1000 and 50000 a unit, every purchase listed twice as in
+    # --join_hm_gc_c_ass, plus rows purchases() has to leave out
+    rng = np.random.default_rng(seed)
+    product = np.arange(n) % 2
+    qty = rng.integers(1, 5, n)
+    unit_price = np.where(product == 0, 1000.0, 50000.0) * rng.uniform(0.8, 1.2, n)
+    gc = pd.DataFrame({
+        'source': 'good_consume',
+        'asset_category': 'C1',
+        'asset_code': 'A1',
+        'asset_name': 'Name A1',
+        'product_id': product,
+        'product_name': np.where(product == 0, 'Oil filter', 'Engine oil'),
+        'date': pd.Timestamp('2024-01-01'),
+        'product_bought_qty': qty,
+        'total_price': unit_price * qty,
+        'consume_id_good_consume': np.arange(n)
+    })
+    skipped = gc.iloc[:3].assign(product_bought_qty=[0, 1, 1], total_price=[100.0, 0.0, np.nan], consume_id_good_consume=[900, 901, 902])
+    return pd.concat([gc, gc, skipped, gc.iloc[:2].assign(source='hm_record')], ignore_index=True)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr('amtiss.storage.DATA_DIR', str(tmp_path))
+    return UnitPriceIndex()
+
+
+def test_purchases_are_counted_once(index):
+    rows = purchases(make_data())
+    assert len(rows.index) == 200
+    assert index.update(rows) == 200
+    assert index.update(rows) == 0
+    assert index.version == 1
+
+
+def test_data_version_skips_the_merge(index):
+    rows = purchases(make_data())
+    assert index.update(rows.iloc[:100], 'v1') == 100
+    # --Same data version, the new rows are not looked at
+    assert index.update(rows, 'v1') == 0
+    assert index.update(rows, 'v2') == 100
+    assert UnitPriceIndex().data_version == 'v2'
+
+
+def test_quantiles_within_a_bin(index):
+    rows = purchases(make_data())
+    index.update(rows)
+    quantiles = index.quantiles().set_index('product_id')
+    exact = rows.groupby('product_id')['unit_price'].quantile(0.5)
+    assert (np.abs(quantiles['p50'] / exact - 1) <= BIN_RATIO - 1).all()
+    assert quantiles['purchases'].tolist() == [100, 100]
+
+
+def test_overpriced_purchase_is_flagged(index):
+    rows = purchases(make_data())
+    index.update(rows)
+    new = rows.iloc[:2].assign(consume_id_good_consume=[1000, 1001], unit_price=[5000.0, 52000.0])
+    scored = index.score(new)
+    assert scored['flagged'].tolist() == [True, False]